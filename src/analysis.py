@@ -1,13 +1,15 @@
 import pandas as pd
 import numpy as np
 import time
+import zlib
 import knapsack
+import knapsack.cache
+import results_store
 
 from pathlib import Path
 from dataclasses import dataclass
-import matplotlib.pyplot as plt
-from concurrent.futures import ProcessPoolExecutor
-from scipy.interpolate import interp1d
+from typing import Iterator, Literal
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 def __numfmt(x):
@@ -34,6 +36,34 @@ class Config:
     mutation_probability: float = 0.1
     mutation_std: float = 0.1
     threshold: float = 1e-4
+    adaptive: bool = False
+    seed: int = 0
+    # `a_star` solutions are looked up in (and added to) this `SolutionCache`, `None` to always solve
+    solution_cache: str | None = None
+    # every run is recorded in this `ResultsStore`, `None` to keep only the summaries
+    results_store: str | None = None
+
+
+@dataclass
+class Task:
+    """A single solver run, the unit of work distributed across the worker pool."""
+
+    config: Config
+    filepath: str
+    algorithm: Literal["pbil", "a_star"]
+    trial: int
+    num_items: int
+
+    @property
+    def seed(self) -> int:
+        """
+        Seed of the task, derived only from the sweep seed, the file and the trial number,
+        so the results do not depend on which worker runs the task or in which order.
+        """
+        sequence = np.random.SeedSequence(
+            [self.config.seed, zlib.crc32(self.filepath.encode()), self.trial]
+        )
+        return int(sequence.generate_state(1)[0])
 
 
 def ecdf(data):
@@ -50,116 +80,318 @@ def ecdf(data):
     return x, y
 
 
-def test_algorithms(config: Config):
-    all_pbil_results = []
-    all_a_star_results = []
+def mean_ecdf(samples: list[np.ndarray], x: np.ndarray) -> np.ndarray:
+    """Evaluate the mean of the ECDFs of all samples at once
+
+    Every sample point carries the weight `1 / (len(samples) * len(sample))`, so the mean ECDF
+    is the cumulative weight of the concatenated points, evaluated with `searchsorted`.
+
+    Args:
+        samples (list[array-like]): one sample per trial
+        x (array-like): points to evaluate the mean ECDF at
+
+    Returns:
+        array-like: mean ECDF at every point of `x`
+    """
+    values = np.concatenate(samples)
+    weights = np.concatenate(
+        [np.full(len(sample), 1 / (len(samples) * len(sample))) for sample in samples]
+    )
+    order = np.argsort(values, kind="stable")
+    cumulative_weights = np.concatenate(([0.0], np.cumsum(weights[order])))
+    return cumulative_weights[np.searchsorted(values[order], x, side="right")]
+
+
+# the solution caches of a worker process, by path, opened once by `open_caches`
+_caches: dict[str, knapsack.SolutionCache] = {}
+
+
+def open_caches(paths: list[str]):
+    """Worker initializer, open one connection per solution cache for all the tasks of the worker."""
+    for path in paths:
+        _caches[path] = knapsack.SolutionCache(path)
+
+
+def run_task(task: Task) -> dict:
+    """Run a single task in a worker process and return its result row."""
+    config = task.config
+    optimal_solution, capacity, items = knapsack.read_data(task.filepath)
+    if task.algorithm == "pbil":
+        start_time = time.time()
+        solution, _, best_values, _ = knapsack.pbil(
+            total_capacity=capacity,
+            items=items,
+            population_size=config.population_size,
+            num_generations=config.num_generations,
+            num_best=config.num_best,
+            learning_rate=config.learning_rate,
+            mutation_probability=config.mutation_probability,
+            mutation_std=config.mutation_std,
+            threshold=config.threshold,
+            adaptive=config.adaptive,
+            seed=task.seed,
+        )
+        elapsed = time.time() - start_time
+        return {
+            "num_items": task.num_items,
+            "capacity": capacity,
+            "seed": task.seed,
+            "generations": len(best_values),
+            "optimal_solution": optimal_solution,
+            "solution": solution,
+            "time": elapsed,
+            "generation_best": np.array([np.max(topN) for topN in best_values]),
+        }
+
+    if config.solution_cache is not None:
+        # a cached solution reports the time of the run that computed it
+        if config.solution_cache not in _caches:
+            open_caches([config.solution_cache])
+        solution, _, best_values, elapsed = knapsack.cached_solve(
+            capacity, items, "a_star", _caches[config.solution_cache]
+        )
+    else:
+        start_time = time.time()
+        solution, _, best_values = knapsack.a_star(items=items, total_capacity=capacity)
+        elapsed = time.time() - start_time
+    return {
+        "num_items": task.num_items,
+        "capacity": capacity,
+        "iterations": len(best_values),
+        "optimal_solution": optimal_solution,
+        "solution": solution,
+        "time": elapsed,
+    }
+
+
+def make_tasks(config: Config) -> list[Task]:
+    tasks = []
     for filepath in config.data_filepaths:
-        optimal_solution, capacity, items = knapsack.read_data(filepath)
+        _, _, items = knapsack.read_data(filepath)
         num_items = len(items)
         if num_items > config.max_items:
             continue
-        print(filepath, num_items, config.max_items)
-
-        pbil_results = []
-        pbil_ecdf_results = []
-        a_star_results = []
-        for _ in range(config.num_trials):
-            start_time = time.time()
-            solution, _, best_values, _ = knapsack.pbil(
-                total_capacity=capacity,
-                items=items,
-                population_size=config.population_size,
-                num_generations=config.num_generations,
-                num_best=config.num_best,
-                learning_rate=config.learning_rate,
-                mutation_probability=config.mutation_probability,
-                mutation_std=config.mutation_std,
-                threshold=config.threshold,
-            )
-            elapsed = time.time() - start_time
-            pbil_results.append(
-                {
-                    "num_items": num_items,
-                    "capacity": capacity,
-                    "generations": len(best_values),
-                    "optimal_solution": optimal_solution,
-                    "solution": solution,
-                    "time": elapsed,
-                }
-            )
-            pbil_ecdf_results.append(ecdf([np.max(topN) for topN in best_values]))
+        for trial in range(config.num_trials):
+            for algorithm in ("pbil", "a_star"):
+                tasks.append(Task(config, filepath, algorithm, trial, num_items))  # type: ignore
+    return tasks
 
-            start_time = time.time()
-            solution, _, best_values = knapsack.a_star(
-                items=items, total_capacity=capacity
-            )
-            elapsed = time.time() - start_time
-            a_star_results.append(
-                {
-                    "num_items": num_items,
-                    "capacity": capacity,
-                    "iterations": len(best_values),
-                    "optimal_solution": optimal_solution,
-                    "solution": solution,
-                    "time": elapsed,
-                }
-            )
-        pbil_results_df = pd.DataFrame(pbil_results)
-        all_pbil_results.append(pbil_results_df)
-
-        a_star_results_df = pd.DataFrame(a_star_results)
-        all_a_star_results.append(a_star_results_df)
-
-        plt.figure(figsize=(8, 5))
-
-        all_x_vals = [r[0] for r in pbil_ecdf_results]
-        all_y_vals = [r[1] for r in pbil_ecdf_results]
-        
-        # Define a common set of x-values (linear space covering all trials)
-        x_common = np.linspace(min(map(np.min, all_x_vals)), max(map(np.max, all_x_vals)), 500)
-        
-        # Interpolate each ECDF onto the common x-values
-        interpolated_y = [interp1d(x, y, bounds_error=False, fill_value=(0, 1))(x_common) for x, y in zip(all_x_vals, all_y_vals)]
-        
-        # Compute the mean ECDF
-        mean_y = np.mean(interpolated_y, axis=0)
-        plt.step(x_common, mean_y, where="post", color="b", label="PBIL")
-
-        plt.xlabel("Wartość")
-        plt.ylabel("Odsetek wartości mniejszych")
-        plt.title("Empiryczna Funkcja Dystrybucji (ECDF)")
-        plt.legend()
-        plt.grid(True)
-        plt.savefig(
-            f"{config.save_path}ecdf-{num_items}-{capacity}.png",
-            format="png",
-        )
 
-    final_results = pd.concat(all_pbil_results, ignore_index=True)
-    summary = (
-        final_results.groupby(["num_items", "capacity", "optimal_solution"])
-        .agg(["max", "mean", "std"])
-        .reset_index()
+def schedule(
+    tasks: list[Task], max_workers: int | None = None
+) -> Iterator[tuple[Task, dict]]:
+    """
+    Run the tasks on a pool of `max_workers` processes and yield the results as they complete.
+    The largest instances are submitted first, so that the long runs do not end up as the tail of the sweep.
+    """
+    tasks = sorted(tasks, key=lambda task: task.num_items, reverse=True)
+    cache_paths = sorted(
+        {task.config.solution_cache for task in tasks} - {None}  # type: ignore
     )
-    summary.to_csv(config.save_path + "pbil.csv", float_format=__numfmt, index=False)
+    # create the databases here, so that the workers do not race to set them up
+    for path in cache_paths:
+        knapsack.SolutionCache(path).close()
+    with ProcessPoolExecutor(
+        max_workers, initializer=open_caches, initargs=(cache_paths,)
+    ) as executor:
+        futures = {executor.submit(run_task, task): task for task in tasks}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def save_raw(
+    config: Config, num_items, capacity, generation_best: list[np.ndarray]
+) -> str:
+    """
+    Save the best value of every generation of every trial of a file, as columns of an `.npz` file.
+    Returns the path of the file, the input of `plot_ecdf`.
+    """
+    path = f"{config.save_path}raw-{num_items}-{capacity}.npz"
+    np.savez(
+        path,
+        trial=np.repeat(
+            np.arange(len(generation_best)), list(map(len, generation_best))
+        ),
+        generation=np.concatenate([np.arange(1, len(g) + 1) for g in generation_best]),
+        value=np.concatenate(generation_best),
+        num_items=num_items,
+        capacity=capacity,
+    )
+    return path
+
+
+def plot_ecdf(raw_path: str) -> str:
+    """Render the mean ECDF of the trials saved by `save_raw`, headless, and return the path of the image."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    with np.load(raw_path) as raw:
+        trial, value = raw["trial"], raw["value"]
+        num_items, capacity = raw["num_items"].item(), raw["capacity"].item()
+    samples = np.split(value, np.flatnonzero(np.diff(trial)) + 1)
+
+    # Define a common set of x-values (linear space covering all trials)
+    x_common = np.linspace(value.min(), value.max(), 500)
+    mean_y = mean_ecdf(samples, x_common)
+
+    fig = plt.figure(figsize=(8, 5))
+    plt.step(x_common, mean_y, where="post", color="b", label="PBIL")
+
+    plt.xlabel("Wartość")
+    plt.ylabel("Odsetek wartości mniejszych")
+    plt.title("Empiryczna Funkcja Dystrybucji (ECDF)")
+    plt.legend()
+    plt.grid(True)
+    image_path = str(Path(raw_path).with_name(f"ecdf-{num_items}-{capacity}.png"))
+    fig.savefig(image_path, format="png")
+    plt.close(fig)
+    return image_path
+
+
+def plot_all(raw_paths: list[str], max_workers: int | None = None) -> list[str]:
+    """Render the plots of all raw files in parallel, after the sweep."""
+    with ProcessPoolExecutor(max_workers) as executor:
+        return list(executor.map(plot_ecdf, raw_paths))
+
+
+# columns of a result row that identify the run rather than measure it, they are kept out of the summaries
+RUN_COLUMNS = ["seed", "generation_best"]
+
 
-    final_results = pd.concat(all_a_star_results, ignore_index=True)
+def save_summary(config: Config, results: list[dict], filename: str):
+    final_results = pd.DataFrame(results).drop(columns=RUN_COLUMNS, errors="ignore")
     summary = (
         final_results.groupby(["num_items", "capacity", "optimal_solution"])
         .agg(["max", "mean", "std"])
         .reset_index()
     )
-    summary.to_csv(config.save_path + "a_star.csv", float_format=__numfmt, index=False)
+    summary.to_csv(config.save_path + filename, float_format=__numfmt, index=False)
 
 
-def process_correlation(correlation):
-    config = Config(
+def pbil_params(config: Config) -> dict:
+    return {
+        "population_size": config.population_size,
+        "num_generations": config.num_generations,
+        "num_best": config.num_best,
+        "learning_rate": config.learning_rate,
+        "mutation_probability": config.mutation_probability,
+        "mutation_std": config.mutation_std,
+        "threshold": config.threshold,
+        "adaptive": config.adaptive,
+    }
+
+
+def store_runs(config: Config, runs: list[tuple[str, int, str, dict]]):
+    """Record the raw runs of a config in its results store, in one transaction per batch."""
+    instances = {}
+    with results_store.ResultsStore(config.results_store) as store:
+        for filepath, trial, algorithm, result in runs:
+            if filepath not in instances:
+                _, capacity, items = knapsack.read_data(filepath)
+                instances[filepath] = (
+                    items,
+                    knapsack.cache.instance_hash(capacity, items),
+                )
+            items, instance_key = instances[filepath]
+            if algorithm == "pbil":
+                params, work = pbil_params(config), result["generations"]
+                best_values = result["generation_best"].tolist()
+            else:
+                params, work, best_values = {}, result["iterations"], None
+            store.add(
+                algorithm,
+                result["capacity"],
+                items,
+                result["solution"],
+                result["time"],
+                params=params,
+                optimal=result["optimal_solution"],
+                instance=filepath,
+                seed=result.get("seed"),
+                trial=trial,
+                work=work,
+                best_values=best_values,
+                tag="analysis",
+                instance_key=instance_key,
+            )
+
+
+def test_algorithms(
+    configs: Config | list[Config], max_workers: int | None = None, plot: bool = True
+):
+    if isinstance(configs, Config):
+        configs = [configs]
+    tasks = [task for config in configs for task in make_tasks(config)]
+    # number of outstanding tasks of every (config, file), to know when a file is finished
+    remaining: dict[tuple[int, str], int] = {}
+    for task in tasks:
+        key = (id(task.config), task.filepath)
+        remaining[key] = remaining.get(key, 0) + 1
+
+    results: dict[tuple[int, str], list[tuple[Task, dict]]] = {}
+    raw_paths = []
+    for task, result in schedule(tasks, max_workers):
+        key = (id(task.config), task.filepath)
+        results.setdefault(key, []).append((task, result))
+        remaining[key] -= 1
+        if remaining[key] == 0:
+            print(task.filepath, task.num_items, task.config.max_items)
+            pbil_results = sorted(
+                (t.trial, r) for t, r in results[key] if t.algorithm == "pbil"
+            )
+            raw_paths.append(
+                save_raw(
+                    task.config,
+                    result["num_items"],
+                    result["capacity"],
+                    [r["generation_best"] for _, r in pbil_results],
+                )
+            )
+
+    for config in configs:
+        # keep the rows in a stable order regardless of the completion order
+        runs = sorted(
+            (
+                (task.filepath, task.trial, task.algorithm, result)
+                for (config_id, _), file_results in results.items()
+                if config_id == id(config)
+                for task, result in file_results
+            ),
+            key=lambda run: run[:3],
+        )
+        pbil_results = [
+            {k: v for k, v in result.items() if k not in RUN_COLUMNS}
+            for _, _, algorithm, result in runs
+            if algorithm == "pbil"
+        ]
+        a_star_results = [
+            result for _, _, algorithm, result in runs if algorithm == "a_star"
+        ]
+        save_summary(config, pbil_results, "pbil.csv")
+        save_summary(config, a_star_results, "a_star.csv")
+        if config.results_store is not None:
+            store_runs(config, runs)
+
+    # rendering is a separate stage, so the workers above only solve
+    if plot:
+        plot_all(raw_paths, max_workers)
+
+
+def make_config(correlation):
+    return Config(
         data_filepaths=list(map(str, Path("data").glob(f"{correlation}/*.csv"))),
         save_path=f"output/{correlation}/",
         num_trials=10,
         max_items=1000,
+        solution_cache=knapsack.cache.DEFAULT_PATH,
+        results_store=results_store.DEFAULT_PATH,
     )
-    test_algorithms(config)
+
+
+def process_correlation(correlation):
+    test_algorithms(make_config(correlation))
 
 
 def main():
@@ -170,10 +402,9 @@ def main():
         "strong_correlation",
     ]
 
-    with ProcessPoolExecutor() as executor:
-        executor.map(process_correlation, correlations)
+    # one pool for all (file, algorithm, trial) tasks of every correlation
+    test_algorithms([make_config(correlation) for correlation in correlations])
 
 
 if __name__ == "__main__":
-    # main()
-    process_correlation("uncorrelated")
+    main()
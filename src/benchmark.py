@@ -0,0 +1,288 @@
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import knapsack
+import results_store
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from data_generator import generate_items
+from knapsack.engine import select_engine
+
+DATASETS = ["small", "uncorrelated", "medium_correlation", "strong_correlation"]
+SYNTHETIC_SIZES = [200, 400, 800]
+BASELINE_FILE = "results/benchmark_baseline.json"
+# `import knapsack` has to stay cheap for short-lived worker processes
+IMPORT_BUDGET_SECONDS = 0.1
+# timings shorter than this are too noisy to be gated on relative change alone
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def run_a_star(capacity, items, seed):
+    counters = knapsack.CounterCollector()
+    value, _, _ = knapsack.a_star(capacity, items, observer=counters)
+    return value, counters.expansions  # nodes expanded
+
+
+def run_dp(capacity, items, seed):
+    value, _, best_values = knapsack.dp(capacity, items)
+    return value, len(best_values) - 1  # items processed
+
+
+def run_pbil(capacity, items, seed):
+    counters = knapsack.CounterCollector()
+    value, _, _, _ = knapsack.pbil(
+        capacity, items, **SOLVER_PARAMS["pbil"], seed=seed, observer=counters
+    )
+    return value, counters.generations  # generations
+
+
+# every solver returns the value found and the amount of work done (nodes, items or generations)
+SOLVERS = {"a_star": run_a_star, "dp": run_dp, "pbil": run_pbil}
+SOLVER_PARAMS = {
+    "a_star": {},
+    "dp": {},
+    "pbil": {
+        "population_size": 100,
+        "num_generations": 100,
+        "learning_rate": 0.1,
+        "engine": "numpy",
+    },
+}
+
+
+@dataclass
+class Instance:
+    dataset: str
+    name: str
+    capacity: int | float
+    items: list[knapsack.Item]
+    optimal: int | float | None = None
+
+
+@dataclass
+class Measurement:
+    solver: str
+    instance: Instance
+    times: list[float]
+    work: int
+    peak_memory: int
+    value: int | float
+
+
+@dataclass
+class Report:
+    import_time: float
+    measurements: list[Measurement] = field(default_factory=list)
+
+
+def load_instances(datasets: list[str], synthetic_sizes: list[int], seed: int):
+    instances = []
+    for dataset in datasets:
+        for filepath in sorted(Path("data").glob(f"{dataset}/*.csv")):
+            optimal, capacity, items = knapsack.read_data(str(filepath))
+            instances.append(Instance(dataset, filepath.name, capacity, items, optimal))
+    random.seed(seed)
+    for num_items in synthetic_sizes:
+        pairs = generate_items(num_items, "uncorrelated")
+        # capacity is 10% more than the sum of weights of half the items, like in `generate_dataset`
+        capacity = int(sum(w for _, w in pairs[: num_items // 2]) * 1.1)
+        items = [knapsack.Item(v, w) for v, w in pairs]
+        instances.append(Instance("synthetic", f"n{num_items}", capacity, items))
+    return instances
+
+
+def measure_import_time(repeats: int) -> float:
+    """Median wall time of `import knapsack` in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import knapsack; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout
+        times.append(float(output))
+    return float(np.median(times))
+
+
+def measure(solver: str, instance: Instance, repeats: int, seed: int) -> Measurement:
+    run = SOLVERS[solver]
+    times = []
+    for repeat in range(repeats):
+        items = list(instance.items)  # a_star sorts the list in place
+        start = time.perf_counter()
+        value, work = run(instance.capacity, items, seed + repeat)
+        times.append(time.perf_counter() - start)
+    # memory is measured in a separate run, tracemalloc slows the solvers down
+    tracemalloc.start()
+    run(instance.capacity, list(instance.items), seed)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Measurement(solver, instance, times, work, peak_memory, value)
+
+
+def applicable(solver: str, instance: Instance) -> bool:
+    if solver == "dp":
+        return select_engine(instance.capacity, instance.items) == "dp"
+    return True
+
+
+def summarize(report: Report) -> dict:
+    """
+    Aggregate the measurements per solver and dataset, and fit `time = c * n^k` per solver.
+    """
+    summary = {"import_time": report.import_time, "solvers": {}}
+    groups: dict[tuple[str, str], list[Measurement]] = {}
+    for m in report.measurements:
+        groups.setdefault((m.solver, m.instance.dataset), []).append(m)
+    for (solver, dataset), measurements in sorted(groups.items()):
+        times = np.concatenate([m.times for m in measurements])
+        summary["solvers"].setdefault(solver, {"datasets": {}})["datasets"][dataset] = {
+            "instances": len(measurements),
+            "median_time": float(np.median(times)),
+            "p95_time": float(np.percentile(times, 95)),
+            "median_work": float(np.median([m.work for m in measurements])),
+            "peak_memory": max(m.peak_memory for m in measurements),
+        }
+    for solver, solver_summary in summary["solvers"].items():
+        points = [
+            (len(m.instance.items), np.median(m.times))
+            for m in report.measurements
+            if m.solver == solver and len(m.instance.items) > 0
+        ]
+        n, t = np.array(points).T
+        if len(set(n)) < 2:
+            continue
+        exponent, log_coefficient = np.polyfit(np.log(n), np.log(t), 1)
+        solver_summary["scaling"] = {
+            "exponent": float(exponent),
+            "coefficient": float(np.exp(log_coefficient)),
+        }
+    return summary
+
+
+def store_measurements(report: Report, path: str, seed: int):
+    """Record every measurement in the results store at `path`, the time of a measurement is its median."""
+    with results_store.ResultsStore(path) as store:
+        for m in report.measurements:
+            store.add(
+                m.solver,
+                m.instance.capacity,
+                m.instance.items,
+                m.value,
+                float(np.median(m.times)),
+                params=SOLVER_PARAMS[m.solver],
+                optimal=m.instance.optimal,
+                instance=f"{m.instance.dataset}/{m.instance.name}",
+                seed=seed,
+                work=m.work,
+                memory=m.peak_memory,
+                tag="benchmark",
+            )
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Return a description of every median time that regressed past `tolerance` against the baseline
+    (and by more than `MIN_REGRESSION_SECONDS`).
+    """
+    regressions = []
+    if summary["import_time"] > IMPORT_BUDGET_SECONDS:
+        regressions.append(
+            f"import knapsack: {summary['import_time']:.3f}s exceeds the {IMPORT_BUDGET_SECONDS}s budget"
+        )
+    limit = baseline.get("import_time", 0) * (1 + tolerance) + MIN_REGRESSION_SECONDS
+    if "import_time" in baseline and summary["import_time"] > limit:
+        regressions.append(
+            f"import knapsack: {summary['import_time']:.3f}s > {limit:.3f}s"
+        )
+    for solver, solver_summary in summary["solvers"].items():
+        for dataset, current in solver_summary["datasets"].items():
+            previous = (
+                baseline.get("solvers", {})
+                .get(solver, {})
+                .get("datasets", {})
+                .get(dataset)
+            )
+            if previous is None:
+                continue
+            limit = previous["median_time"] * (1 + tolerance) + MIN_REGRESSION_SECONDS
+            if current["median_time"] > limit:
+                regressions.append(
+                    f"{solver}/{dataset}: median {current['median_time']:.4f}s > {limit:.4f}s"
+                )
+    return regressions
+
+
+def print_summary(summary: dict):
+    print(f"import knapsack: {summary['import_time'] * 1000:.1f} ms")
+    print(
+        f"{'solver':<8} {'dataset':<20} {'n':>3} {'median [s]':>11} {'p95 [s]':>10} {'work':>10} {'peak [KiB]':>11}"
+    )
+    for solver, solver_summary in summary["solvers"].items():
+        for dataset, s in solver_summary["datasets"].items():
+            print(
+                f"{solver:<8} {dataset:<20} {s['instances']:>3} {s['median_time']:>11.5f} {s['p95_time']:>10.5f} {s['median_work']:>10.0f} {s['peak_memory'] / 1024:>11.1f}"
+            )
+        if "scaling" in solver_summary:
+            scaling = solver_summary["scaling"]
+            print(
+                f"{solver:<8} time ~ {scaling['coefficient']:.3g} * n^{scaling['exponent']:.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the knapsack solvers.")
+    parser.add_argument("--solvers", nargs="+", default=list(SOLVERS), choices=SOLVERS)
+    parser.add_argument("--datasets", nargs="+", default=DATASETS)
+    parser.add_argument(
+        "--synthetic-sizes", nargs="*", type=int, default=SYNTHETIC_SIZES
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--results-store",
+        default=results_store.DEFAULT_PATH,
+        help="record the measurements in this results store, an empty string to skip it",
+    )
+    args = parser.parse_args()
+
+    report = Report(import_time=measure_import_time(args.repeats))
+    for instance in load_instances(args.datasets, args.synthetic_sizes, args.seed):
+        for solver in args.solvers:
+            if applicable(solver, instance):
+                report.measurements.append(
+                    measure(solver, instance, args.repeats, args.seed)
+                )
+    summary = summarize(report)
+    print_summary(summary)
+    if args.results_store:
+        store_measurements(report, args.results_store, args.seed)
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(summary, indent=2))
+        print(f"baseline written to {baseline_path}")
+        return
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    regressions = compare(summary, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,30 @@
+import argparse
+import json
+import math
 import os
 import random
 from typing import List, Tuple, Literal
+import numpy as np
 import pandas as pd
 
-from knapsack import a_star, Item
+from knapsack import a_star_anytime, cached_solve, Item, CounterCollector, SolutionCache
+from knapsack.cache import DEFAULT_PATH
+from knapsack.engine import select_engine
+from knapsack.reader import write_cache
+
+Correlation = Literal["uncorrelated", "medium_correlation", "strong_correlation"]
+
+CORR_TYPES = ["uncorrelated", "medium_correlation", "strong_correlation"]
+ITEM_SIZES = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 75, 100]
+# number of rows formatted and written to the CSV file at once
+CHUNK_SIZE = 1_000_000
+# budget of the bounded A* search that labels the instances too large for dynamic programming
+A_STAR_DEADLINE_SECONDS = 10.0
 
 
 def generate_items(
     num_items: int,
-    correlation: Literal["uncorrelated", "medium_correlation", "strong_correlation"],
+    correlation: Correlation,
     min_weight: int = 5,
     max_weight: int = 100,
     min_value: int = 10,
@@ -27,45 +43,263 @@ def generate_items(
     return list(zip(values, weights))
 
 
-def generate_dataset():
+def generate_arrays(
+    num_items: int,
+    correlation: Correlation,
+    rng: np.random.Generator,
+    min_weight: int = 5,
+    max_weight: int = 100,
+    min_value: int = 10,
+    max_value: int = 500,
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Generate and save knapsack datasets for different sizes and correlation types.
+    Vectorized `generate_items`, returns the values and the weights as integer arrays.
     """
-    CORR_TYPES = ["uncorrelated", "medium_correlation", "strong_correlation"]
-    ITEM_SIZES = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 75, 100]
-    BASE_DIR = "data"
-    os.makedirs(BASE_DIR, exist_ok=True)
+    weights = rng.integers(min_weight, max_weight, num_items, endpoint=True)
+    if correlation == "uncorrelated":
+        values = rng.integers(min_value, max_value, num_items, endpoint=True)
+    elif correlation == "medium_correlation":
+        values = (weights * (0.5 + rng.uniform(-0.5, 0.5, num_items))).astype(
+            np.int64
+        ) + 1
+    elif correlation == "strong_correlation":
+        values = (weights * rng.uniform(0.9, 1.1, num_items)).astype(np.int64)
+    else:
+        raise ValueError(f"unknown correlation: {correlation!r}")
+    return values, weights
 
-    for correlation in CORR_TYPES:
-        correlation_dir = os.path.join(BASE_DIR, correlation)
-        os.makedirs(correlation_dir, exist_ok=True)
 
-        for num_items in ITEM_SIZES:
-            print(f"\nGenerating: {correlation} - {num_items}")
-            items = generate_items(num_items, correlation)  # type: ignore
+def bounds(
+    total_capacity: int, values: np.ndarray, weights: np.ndarray
+) -> tuple[int, int]:
+    """
+    Greedy lower bound and fractional (Dantzig) upper bound of the optimal value, in `O(n log n)`.
+    # Args:
+        total_capacity (`int`): the total capacity of the knapsack. \\
+        values (`np.ndarray`): the integer values of the items. \\
+        weights (`np.ndarray`): the integer weights of the items.
+    # Returns:
+        `int`: the value of the greedy solution.
+        `int`: the rounded down value of the fractional relaxation.
+    """
+    order = np.argsort(-values / weights, kind="stable")
+    sorted_values, sorted_weights = values[order], weights[order]
+    cumulative_weights = np.cumsum(sorted_weights)
+    # the first `split` items fit entirely, the next one is the critical item
+    split = int(np.searchsorted(cumulative_weights, total_capacity, side="right"))
+    used_weight = int(cumulative_weights[split - 1]) if split > 0 else 0
+    used_value = int(sorted_values[:split].sum())
+    if split == len(order):
+        return used_value, used_value
+    remaining_capacity = total_capacity - used_weight
+    upper_bound = used_value + remaining_capacity * int(sorted_values[split]) // int(
+        sorted_weights[split]
+    )
 
-            # capacity is 10% more than the sum of weights of half the items
-            half_items = items[: num_items // 2]
-            capacity = int(sum(w for _, w in half_items) * 1.1)
+    # greedy keeps filling with the following items, until not even the lightest one fits
+    lower_bound = used_value
+    lightest_from = np.minimum.accumulate(sorted_weights[::-1])[::-1]
+    for j in range(split + 1, len(order)):
+        if lightest_from[j] > remaining_capacity:
+            break
+        if sorted_weights[j] <= remaining_capacity:
+            remaining_capacity -= int(sorted_weights[j])
+            lower_bound += int(sorted_values[j])
+    return lower_bound, upper_bound
 
-            # get optimal value and items
-            optimal_value, res, _ = a_star(capacity, [Item(i[0], i[1]) for i in items])
 
-            # print some info about dataset
-            idf = pd.DataFrame(items, columns=["value", "weight"])
-            print(
-                f"Optimal value for {num_items} items ({correlation}): {optimal_value}; items: {sum(res)}; correlation:"
+def write_instance(
+    filename: str,
+    optimal_value: int | float,
+    total_capacity: int | float,
+    values: np.ndarray,
+    weights: np.ndarray,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """
+    Write an instance in the CSV format read by `knapsack.read_data` (the first row holds the optimal value
+    and the capacity), `chunk_size` rows at a time, and prime the binary cache of the reader.
+    """
+    with open(filename, "w") as f:
+        f.write(f"value,weight\n{optimal_value},{total_capacity}\n")
+        for start in range(0, len(values), chunk_size):
+            chunk = pd.DataFrame(
+                {
+                    "value": values[start : start + chunk_size],
+                    "weight": weights[start : start + chunk_size],
+                }
             )
-            print(idf.corr())
+            chunk.to_csv(f, header=False, index=False)
+    write_cache(filename, optimal_value, total_capacity, values, weights)
+
 
-            # save to csv
+def generate_instance(
+    filename: str,
+    num_items: int,
+    correlation: Correlation,
+    seed: int | None = None,
+    preprocess: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    solution_cache: SolutionCache | None = None,
+    a_star_deadline: float = A_STAR_DEADLINE_SECONDS,
+) -> dict:
+    """
+    Generate, label and save one instance.
+    The instance is solved exactly when the dynamic programming table fits in `knapsack.engine.DP_MAX_CELLS`.
+    Otherwise A* searches it for at most `a_star_deadline` seconds, which usually proves the optimum;
+    when it does not, the first row holds the best value found, and only the bounds of the optimum are known.
+    Either way, the label is also written to a JSON file next to the CSV file.
+    # Args:
+        filename (`str`): the path of the CSV file. \\
+        num_items (`int`): the number of items. \\
+        correlation (`str`): the correlation between the values and the weights. \\
+        seed (`int | None`): seed of the instance, `None` for a fresh one. \\
+        preprocess (`bool`): whether to fix items with `knapsack.reduce` before solving exactly. \\
+        chunk_size (`int`): the number of rows written at once. \\
+        solution_cache (`SolutionCache | None`): where to look up the optimum before solving, and store it after. \
+        a_star_deadline (`float`): the time limit of the A* search, in seconds.
+    # Returns:
+        `dict`: the label of the instance.
+    """
+    values, weights = generate_arrays(
+        num_items, correlation, np.random.default_rng(seed)
+    )
+    # capacity is 10% more than the sum of weights of half the items
+    capacity = int(weights[: num_items // 2].sum() * 1.1)
+    lower_bound, upper_bound = bounds(capacity, values, weights)
+
+    label = {
+        "num_items": num_items,
+        "correlation": correlation,
+        "seed": seed,
+        "capacity": capacity,
+        "exact": lower_bound == upper_bound,
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+    }
+    if not label["exact"]:
+        items = list(map(Item, values.tolist(), weights.tolist()))
+        if select_engine(capacity, items) == "dp":
+            counters = CounterCollector()
+            optimal_value, _, _, _ = cached_solve(
+                capacity,
+                items,
+                "solve",
+                solution_cache,
+                observer=counters,
+                engine="dp",
+                preprocess=preprocess,
+            )
+            label.update(
+                exact=True, lower_bound=optimal_value, upper_bound=optimal_value
+            )
+            if counters.reduction is not None:
+                label["reduction"] = counters.reduction
+        else:
+            value, _, _, a_star_bound, is_optimal = a_star_anytime(
+                capacity,
+                items,
+                deadline_seconds=a_star_deadline,
+                record_trace=False,
+                preprocess=preprocess,
+            )
+            label.update(
+                exact=is_optimal,
+                lower_bound=max(lower_bound, value),
+                # the values are integers, so is the optimum
+                upper_bound=(
+                    value if is_optimal else min(upper_bound, math.floor(a_star_bound))
+                ),
+            )
+
+    write_instance(
+        filename, label["lower_bound"], capacity, values, weights, chunk_size
+    )
+    with open(os.path.splitext(filename)[0] + ".json", "w") as f:
+        json.dump(label, f, indent=2)
+    return label
+
+
+def generate_dataset(
+    item_sizes: list[int] = ITEM_SIZES,
+    seed: int = 0,
+    preprocess: bool = False,
+    base_dir: str = "data",
+    chunk_size: int = CHUNK_SIZE,
+    solution_cache: str | None = DEFAULT_PATH,
+    a_star_deadline: float = A_STAR_DEADLINE_SECONDS,
+):
+    """
+    Generate and save knapsack datasets for different sizes and correlation types.
+    Every instance gets its own seed, derived from `seed`, the correlation and the size.
+    With `preprocess`, the optimum is computed on the instance reduced by `knapsack.reduce`.
+    Optima are kept in the `SolutionCache` at `solution_cache` (`None` to always solve),
+    so regenerating an unchanged dataset does not solve anything.
+    Instances too large for dynamic programming are searched with A* for at most `a_star_deadline` seconds.
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    cache = SolutionCache(solution_cache) if solution_cache is not None else None
+
+    for c, correlation in enumerate(CORR_TYPES):
+        correlation_dir = os.path.join(base_dir, correlation)
+        os.makedirs(correlation_dir, exist_ok=True)
+
+        for num_items in item_sizes:
+            print(f"\nGenerating: {correlation} - {num_items}")
+            instance_seed = int(
+                np.random.SeedSequence([seed, c, num_items]).generate_state(1)[0]
+            )
             filename = os.path.join(correlation_dir, f"knapsack_{num_items}.csv")
-            # add optimal value and capacity first
-            idf.loc[-1] = [optimal_value, capacity]
-            idf.index += 1
-            idf = idf.sort_index()
-            idf.to_csv(filename, index=False)
+            label = generate_instance(
+                filename,
+                num_items,
+                correlation,  # type: ignore
+                instance_seed,
+                preprocess,
+                chunk_size,
+                cache,
+                a_star_deadline,
+            )
+            if "reduction" in label:
+                print(f"Reduction: {label['reduction']}")
+
+            # print some info about dataset
+            if label["exact"]:
+                print(
+                    f"Optimal value for {num_items} items ({correlation}): {label['lower_bound']}"
+                )
+            else:
+                print(
+                    f"Optimal value for {num_items} items ({correlation}) between {label['lower_bound']} and {label['upper_bound']}"
+                )
+    if cache is not None:
+        print(f"\nSolution cache: {cache.stats}")
+        cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate knapsack datasets.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=ITEM_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--preprocess", action="store_true")
+    parser.add_argument("--base-dir", default="data")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--solution-cache", default=DEFAULT_PATH)
+    parser.add_argument("--no-solution-cache", action="store_true")
+    parser.add_argument(
+        "--a-star-deadline", type=float, default=A_STAR_DEADLINE_SECONDS
+    )
+    args = parser.parse_args()
+    generate_dataset(
+        args.sizes,
+        args.seed,
+        args.preprocess,
+        args.base_dir,
+        args.chunk_size,
+        None if args.no_solution_cache else args.solution_cache,
+        args.a_star_deadline,
+    )
 
 
 if __name__ == "__main__":
-    generate_dataset()
+    main()
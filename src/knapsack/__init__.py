@@ -1,5 +1,68 @@
 from .typing import *
-from .reader import read_data
+import sys
+from importlib import import_module
+from types import ModuleType
+from typing import TYPE_CHECKING
 
-from .a_star import a_star
-from .pbil import pbil
+# public names and the submodules they live in, imported on first access
+# so that e.g. `from knapsack import a_star` does not pull in pandas or NumPy
+_LAZY_ATTRIBUTES = {
+    "read_data": ".reader",
+    "read_arrays": ".reader",
+    "a_star": ".a_star",
+    "a_star_anytime": ".a_star",
+    "pbil": ".pbil",
+    "pbil_batch": ".pbil",
+    "pbil_islands": ".pbil",
+    "dp": ".dp",
+    "solve": ".engine",
+    "reduce": ".reduce",
+    "Reduction": ".reduce",
+    "Observer": ".observers",
+    "TraceCollector": ".observers",
+    "DecimatedTraceCollector": ".observers",
+    "CounterCollector": ".observers",
+    "SolutionCache": ".cache",
+    "cached_solve": ".cache",
+    "SolverSession": ".session",
+}
+
+if TYPE_CHECKING:
+    from .reader import read_data, read_arrays
+    from .a_star import a_star, a_star_anytime
+    from .pbil import pbil, pbil_batch, pbil_islands
+    from .dp import dp
+    from .engine import solve
+    from .reduce import reduce, Reduction
+    from .observers import (
+        Observer,
+        TraceCollector,
+        DecimatedTraceCollector,
+        CounterCollector,
+    )
+    from .cache import SolutionCache, cached_solve
+    from .session import SolverSession
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+class _Package(ModuleType):
+    def __setattr__(self, name: str, value):
+        # importing e.g. `knapsack.a_star` binds the submodule on the package,
+        # keep the function of the same name bound instead, like eager imports did
+        if name in _LAZY_ATTRIBUTES and isinstance(value, ModuleType):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
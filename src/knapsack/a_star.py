@@ -1,38 +1,72 @@
 from .typing import Item
+from .observers import ExpansionEvent, Observer
+from .reduce import reduce
+from bisect import bisect_right
 from heapq import heappop, heappush
+from itertools import accumulate
+from math import floor, inf
+from time import perf_counter
 from functools import total_ordering
+from typing import Literal
 
 
 @total_ordering
 class State:
     """
     Class to represent a state in the A* search for the knapsack problem.
+    The decision path is not copied into every state, instead each state points to its parent
+    and stores only the decision made for the previous item.
     # Fields:
     total_value (`int | float`) - the total value of the items in the knapsack so far. \\
     current_weight (`int | float`) - the total weight of the items in the knapsack so far. \\
     remaining_capacity (`int | float`) - the remaining capacity of the knapsack. \\
     curr_item_index (`int`) - the current index in the item list. \\
     heuristic_value (`int | float`) - the heuristic function value. \\
-    picked_items (`list[bool]`) - representation vector of picked items.
+    parent (`State | None`) - the state this one was expanded from. \\
+    picked (`bool`) - whether the item at `curr_item_index - 1` was picked.
     """
 
+    __slots__ = (
+        "current_value",
+        "current_weight",
+        "remaining_capacity",
+        "heuristic_value",
+        "curr_item_index",
+        "parent",
+        "picked",
+    )
+
     current_value: int | float
     current_weight: int | float
     remaining_capacity: int | float
     heuristic_value: int | float
     curr_item_index: int
-    picked_items: list[bool]
+    parent: "State | None"
+    picked: bool
 
-    def __init__(self, value, weight, capacity, heuristic, index, picked_items):
+    def __init__(
+        self, value, weight, capacity, heuristic, index, parent=None, picked=False
+    ):
         self.current_value = value
         self.current_weight = weight
         self.remaining_capacity = capacity
         self.heuristic_value = heuristic
         self.curr_item_index = index
-        self.picked_items = picked_items
+        self.parent = parent
+        self.picked = picked
+
+    @property
+    def picked_items(self) -> list[bool]:
+        """Representation vector of picked items, rebuilt by walking the parent pointers."""
+        picked_items = [False] * self.curr_item_index
+        state = self
+        while state.parent is not None:
+            picked_items[state.curr_item_index - 1] = state.picked
+            state = state.parent
+        return picked_items
 
     def __repr__(self):
-        return f"State(total_value={self.current_value}, current_weight={self.current_weight}, remaining_capacity={self.remaining_capacity}, heuristic_value={self.heuristic_value}, curr_item_index={self.curr_item_index}, picked_items={self.picked_items})"
+        return f"State(total_value={self.current_value}, current_weight={self.current_weight}, remaining_capacity={self.remaining_capacity}, heuristic_value={self.heuristic_value}, curr_item_index={self.curr_item_index}, picked={self.picked})"
 
     def __eq__(self, other):
         if not isinstance(other, State):
@@ -51,125 +85,546 @@ class State:
         )
 
 
-def a_star(
+class TranspositionTable:
+    """
+    Index of the states seen so far, keyed on the item index and the used weight, used to drop dominated states.
+    A state is dominated by another one at the same index that weighs no more and is worth no less,
+    since every completion of the former is also a completion of the latter.
+    With `weight_bucket`, weights that fall into the same bucket share an entry, which still only prunes
+    states that are truly dominated, but lets float weights collide.
+    Once `max_entries` is reached, the oldest entries are evicted first.
+    # Fields:
+    entries (`dict[tuple[int, int | float], tuple[int | float, int | float]]`) - (index, weight key) to (weight, value). \\
+    max_entries (`int`) - the memory budget, in entries. \\
+    weight_bucket (`float | None`) - width of the weight buckets, `None` for exact weights. \\
+    evictions (`int`) - the number of entries evicted so far.
+    """
+
+    __slots__ = ("entries", "max_entries", "weight_bucket", "evictions")
+
+    entries: dict[tuple[int, int | float], tuple[int | float, int | float]]
+    max_entries: int
+    weight_bucket: float | None
+    evictions: int
+
+    def __init__(self, max_entries=1_000_000, weight_bucket=None):
+        self.entries = {}
+        self.max_entries = max_entries
+        self.weight_bucket = weight_bucket
+        self.evictions = 0
+
+    def key(self, index: int, weight: int | float) -> tuple[int, int | float]:
+        if self.weight_bucket is None:
+            return index, weight
+        return index, floor(weight / self.weight_bucket)
+
+    def dominated(self, index: int, weight: int | float, value: int | float) -> bool:
+        """
+        Check whether a new state is dominated by one already seen, and record it otherwise.
+        """
+        key = self.key(index, weight)
+        entry = self.entries.get(key)
+        if entry is not None:
+            seen_weight, seen_value = entry
+            if seen_weight <= weight and seen_value >= value:
+                return True
+            if not (weight <= seen_weight and value >= seen_value):
+                return False  # incomparable states, keep the older entry
+        elif len(self.entries) >= self.max_entries:
+            del self.entries[next(iter(self.entries))]
+            self.evictions += 1
+        self.entries[key] = (weight, value)
+        return False
+
+    def superseded(self, index: int, weight: int | float, value: int | float) -> bool:
+        """
+        Check whether a state that was recorded earlier has since been dominated by a better one.
+        """
+        entry = self.entries.get(self.key(index, weight))
+        if entry is None or entry == (weight, value):
+            return False
+        seen_weight, seen_value = entry
+        return seen_weight <= weight and seen_value >= value
+
+
+def greedy(
     total_capacity: int | float, items: list[Item]
+) -> tuple[int | float, list[bool]]:
+    """
+    Pick the items in the given order, skipping the ones that do not fit anymore.
+    Called with items sorted by value-to-weight ratio, it gives a fast lower bound on the optimum.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack. \\
+        items (`list[Item]`): List of the items that are available to be picked.
+
+    # Returns:
+        `int | float`: the total value of the items picked.
+        `list[bool]`: the representation vector of the items picked.
+    """
+    remaining_capacity = total_capacity
+    value = 0
+    representation_vector = []
+    for item in items:
+        picked = item.weight <= remaining_capacity
+        if picked:
+            remaining_capacity -= item.weight
+            value += item.value
+        representation_vector.append(picked)
+    return value, representation_vector
+
+
+def a_star(
+    total_capacity: int | float,
+    items: list[Item],
+    observer: Observer | None = None,
+    record_trace: bool = True,
+    deadline_seconds: float | None = None,
+    max_nodes: int | None = None,
+    dominance: bool = True,
+    max_table_entries: int = 1_000_000,
+    weight_bucket: float | None = None,
+    incumbent: list[bool] | None = None,
+    preprocess: bool = False,
+    search: Literal["best_first", "dfbnb", "beam"] = "best_first",
+    beam_width: int = 1000,
+    max_queue_size: int | None = None,
+    presorted: bool = False,
 ) -> tuple[int | float, list[bool], list[tuple[int, int | float]]]:
     """
     Solve the knapsack problem using A* search.
     # Args:
         total_capacity (`int | float`): the total capacity of the knapsack. \\
-        items (`list[Item]`): List of the items that are available to be picked.
+        items (`list[Item]`): List of the items that are available to be picked. \\
+        observer (`Observer | None`): receives an `ExpansionEvent` after every expanded state. \\
+        record_trace (`bool`): whether to collect the best values over the course of iterations. \\
+        deadline_seconds (`float | None`): stop with the best solution found so far after this many seconds. \\
+        max_nodes (`int | None`): stop with the best solution found so far after expanding this many states. \\
+        dominance (`bool`): whether to drop states dominated by one already seen, see `TranspositionTable`. \\
+        max_table_entries (`int`): the memory budget of the dominance index, in entries. \\
+        weight_bucket (`float | None`): share dominance entries between weights in buckets of this width (useful for float weights). \\
+        incumbent (`list[bool] | None`): a known feasible solution (e.g. from `pbil`), in the order of `items` before sorting.
+            The search starts from the better of it and the greedy solution, and never pushes states that cannot beat it. \\
+        preprocess (`bool`): whether to fix items with `knapsack.reduce` first and search only the remaining core. \\
+        search (`"best_first" | "dfbnb" | "beam"`): the search strategy, all of them use the same bound.
+            `"best_first"` (A*) expands the fewest states, but its queue can grow exponentially.
+            `"dfbnb"` (depth-first branch-and-bound) keeps at most two states per depth.
+            `"beam"` keeps only the `beam_width` best states of every depth, so it may miss the optimum. \\
+        beam_width (`int`): the number of states kept at every depth by the beam search. \\
+        max_queue_size (`int | None`): the memory cap of the best-first queue, in states. Once exceeded,
+            the search continues depth-first from the queued states, best bound first. `None` for no cap. \\
+        presorted (`bool`): whether `items` are already sorted by descending value-to-weight ratio (e.g. kept sorted
+            by a `SolverSession`), then they are neither sorted nor reordered and `incumbent` is in their order.
 
     # Returns:
-        `tuple[int | float, list[bool]]`: the total value of the items picked and the best solution representation vector.
+        `int | float`: the total value of the items picked.
+        `list[bool]`: the best solution representation vector.
+        `list[tuple[int, int | float]]`: the best values over the course of iterations (empty if `record_trace` is off).
     """
+    return a_star_anytime(
+        total_capacity,
+        items,
+        deadline_seconds=deadline_seconds,
+        max_nodes=max_nodes,
+        observer=observer,
+        record_trace=record_trace,
+        dominance=dominance,
+        max_table_entries=max_table_entries,
+        weight_bucket=weight_bucket,
+        incumbent=incumbent,
+        preprocess=preprocess,
+        search=search,
+        beam_width=beam_width,
+        max_queue_size=max_queue_size,
+        presorted=presorted,
+    )[:3]
 
-    def heuristic(
-        items: list[Item], capacity: int | float, item_index: int
-    ) -> int | float:
+
+def a_star_anytime(
+    total_capacity: int | float,
+    items: list[Item],
+    deadline_seconds: float | None = None,
+    max_nodes: int | None = None,
+    observer: Observer | None = None,
+    record_trace: bool = True,
+    dominance: bool = True,
+    max_table_entries: int = 1_000_000,
+    weight_bucket: float | None = None,
+    incumbent: list[bool] | None = None,
+    preprocess: bool = False,
+    search: Literal["best_first", "dfbnb", "beam"] = "best_first",
+    beam_width: int = 1000,
+    max_queue_size: int | None = None,
+    presorted: bool = False,
+) -> tuple[int | float, list[bool], list[tuple[int, int | float]], int | float, bool]:
+    """
+    Solve the knapsack problem using A* search within a time and node budget.
+    When a budget runs out, the best solution found so far is returned together with an upper bound
+    on the optimum taken from the unexplored states. A beam search that dropped states which could
+    still beat its solution does not prove optimality either.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack. \\
+        items (`list[Item]`): List of the items that are available to be picked. \\
+        deadline_seconds (`float | None`): stop after this many seconds, `None` for no limit. \\
+        max_nodes (`int | None`): stop after expanding this many states, `None` for no limit. \\
+        observer (`Observer | None`): receives an `ExpansionEvent` after every expanded state. \\
+        record_trace (`bool`): whether to collect the best values over the course of iterations. \\
+        dominance, max_table_entries, weight_bucket, incumbent, preprocess,
+        search, beam_width, max_queue_size, presorted: see `a_star`.
+
+    # Returns:
+        `int | float`: the total value of the items picked.
+        `list[bool]`: the best solution representation vector.
+        `list[tuple[int, int | float]]`: the best values over the course of iterations (empty if `record_trace` is off).
+        `int | float`: an upper bound on the optimal value, equal to the value when optimality was proven.
+        `bool`: whether the returned solution is proven to be optimal.
+    """
+    if search not in ("best_first", "dfbnb", "beam"):
+        raise ValueError(f"unknown search: {search!r}")
+    deadline = None if deadline_seconds is None else perf_counter() + deadline_seconds
+
+    # sort the items by value-to-weight ratio, the order is needed to map the incumbent
+    if not presorted:
+        order = sorted(range(len(items)), key=lambda i: items[i].ratio, reverse=True)
+        items[:] = [items[i] for i in order]
+        if incumbent is not None:
+            incumbent = [incumbent[i] for i in order]
+    if incumbent is not None:
+        weight = sum(item.weight for item, picked in zip(items, incumbent) if picked)
+        if weight > total_capacity:
+            raise ValueError("the incumbent exceeds the capacity of the knapsack")
+
+    if preprocess:
+        # search only the core of the sorted items, then map the result back
+        reduction = reduce(total_capacity, items)
+        if observer is not None:
+            observer.on_reduction(reduction)
+        core_incumbent = None
+        if incumbent is not None:
+            core_incumbent = [incumbent[i] for i in reduction.core_indices]
+            core_weight = sum(
+                item.weight
+                for item, picked in zip(reduction.items, core_incumbent)
+                if picked
+            )
+            if core_weight > reduction.total_capacity:
+                core_incumbent = None  # it does not respect the fixed items
+        value, vector, trace, upper_bound, is_optimal = a_star_anytime(
+            reduction.total_capacity,
+            reduction.items,
+            deadline_seconds=deadline_seconds,
+            max_nodes=max_nodes,
+            observer=observer,
+            record_trace=record_trace,
+            dominance=dominance,
+            max_table_entries=max_table_entries,
+            weight_bucket=weight_bucket,
+            incumbent=core_incumbent,
+            search=search,
+            beam_width=beam_width,
+            max_queue_size=max_queue_size,
+            presorted=True,
+        )
+        return (
+            value + reduction.fixed_value,
+            reduction.expand(vector),
+            [(iteration, v + reduction.fixed_value) for iteration, v in trace],
+            upper_bound + reduction.fixed_value,
+            is_optimal,
+        )
+
+    # prefix sums of weights and values, cumulative_*[i] covers items[:i]
+    cumulative_weights = list(accumulate((item.weight for item in items), initial=0))
+    cumulative_values = list(accumulate((item.value for item in items), initial=0))
+    # suffix minimum of weights, lightest_from[i] is the lightest item in items[i:]
+    lightest_from = [inf] * (len(items) + 1)
+    for i in range(len(items) - 1, -1, -1):
+        lightest_from[i] = min(items[i].weight, lightest_from[i + 1])
+
+    def heuristic(capacity: int | float, item_index: int) -> int | float:
         """
-        Calculate the heuristic value for the given items, capacity, and item index.
+        Calculate the fractional (Dantzig) bound for the items from `item_index` onwards.
         # Args:
-            items (`list[Item]`): list of items that can be picked. \\
             capacity (`int | float`): the remaining capacity of the knapsack. \\
             item_index (`int`): the index of the current item under consideration.
 
         # Returns:
             `int | float`: the calculated heuristic value.
-            `list[bool]`: the representation vector of the best solution.
-            `list[tuple[int, int | float]]`: the best values over the course of iterations.
         """
-        remaining_capacity = capacity
-        if all(item.weight > remaining_capacity for item in items[item_index:]):
+        if lightest_from[item_index] > capacity:
             return 0
-        value = 0
-        for i in range(item_index, len(items)):
-            if items[i].weight <= remaining_capacity:
-                remaining_capacity -= items[i].weight
-                value += items[i].value
-            else:
-                value += items[i].ratio * remaining_capacity
-                break
+        # the last item that still fits whole is found with a binary search
+        split = (
+            bisect_right(cumulative_weights, cumulative_weights[item_index] + capacity)
+            - 1
+        )
+        value = cumulative_values[split] - cumulative_values[item_index]
+        if split < len(items):
+            remaining_capacity = capacity - (
+                cumulative_weights[split] - cumulative_weights[item_index]
+            )
+            value += items[split].ratio * remaining_capacity
         return value
 
-    # sort the items by value-to-weight ratio
-    items.sort(key=lambda item: item.ratio, reverse=True)
+    # start from the greedy solution, or the given incumbent if it is better
+    best_value, best_vector = greedy(total_capacity, items)
+    if incumbent is not None:
+        value = sum(item.value for item, picked in zip(items, incumbent) if picked)
+        if value > best_value:
+            best_value, best_vector = value, incumbent
+    # set once the search improves on the starting solution
+    best_state: State | None = None
 
-    # initialize the queue with the initial state
-    queue = []
-    initial_state = State(
-        0, 0, total_capacity, heuristic(items, total_capacity, 0), 0, []
+    best_values: list[tuple[int, int | float]] = (
+        [(0, best_value)] if record_trace else []
     )
-    heappush(queue, initial_state)
-    best_value = 0
-    best_items = []
-    best_values: list[tuple[int, int | float]] = [(0, 0)]
     iteration = 0
+    nodes_generated = 1
+    nodes_pruned = 0
+    table = TranspositionTable(max_table_entries, weight_bucket) if dominance else None
+
+    def expand(state: State) -> list[State]:
+        """
+        Create the children of a state, the picked one first, skipping the ones that
+        do not fit, cannot beat the incumbent or are dominated.
+        """
+        nonlocal nodes_generated, nodes_pruned
+        children = []
+        item = items[state.curr_item_index]
+        next_index = state.curr_item_index + 1
+
+        # create a state where the item is picked (if it fits, can beat the incumbent and is not dominated)
+        picked_weight = state.current_weight + item.weight
+        picked_value = state.current_value + item.value
+        picked_heuristic = 0
+        if picked_weight <= total_capacity:
+            picked_heuristic = heuristic(
+                state.remaining_capacity - item.weight, next_index
+            )
+        if (
+            picked_weight <= total_capacity
+            and picked_value + picked_heuristic > best_value
+            and (
+                table is None
+                or not table.dominated(next_index, picked_weight, picked_value)
+            )
+        ):
+            children.append(
+                State(
+                    picked_value,
+                    picked_weight,
+                    state.remaining_capacity - item.weight,
+                    picked_heuristic,
+                    next_index,
+                    state,
+                    True,
+                )
+            )
+            nodes_generated += 1
+        else:
+            nodes_pruned += 1
+
+        # create a state where the item is not picked (if it can beat the incumbent and is not dominated)
+        skipped_heuristic = heuristic(state.remaining_capacity, next_index)
+        if state.current_value + skipped_heuristic > best_value and (
+            table is None
+            or not table.dominated(
+                next_index, state.current_weight, state.current_value
+            )
+        ):
+            children.append(
+                State(
+                    state.current_value,
+                    state.current_weight,
+                    state.remaining_capacity,
+                    skipped_heuristic,
+                    next_index,
+                    state,
+                    False,
+                )
+            )
+            nodes_generated += 1
+        else:
+            nodes_pruned += 1
+        return children
+
+    def out_of_budget() -> bool:
+        return (max_nodes is not None and iteration >= max_nodes) or (
+            deadline is not None and perf_counter() >= deadline
+        )
+
+    initial_state = State(0, 0, total_capacity, heuristic(total_capacity, 0), 0)
+    if search == "beam":
+        # keep only the `beam_width` states with the best bounds at every depth
+        frontier = [initial_state]
+        # the best bound of the states dropped from the beam, the optimum is proven only if it cannot win
+        dropped_bound = -inf
+        is_optimal = True
+        while frontier and is_optimal:
+            next_frontier = []
+            for current_state in frontier:
+                if out_of_budget():
+                    is_optimal = False
+                    dropped_bound = max(
+                        dropped_bound,
+                        max(
+                            state.current_value + state.heuristic_value
+                            for state in frontier
+                        ),
+                    )
+                    break
+                iteration += 1
+                if current_state.current_value > best_value:
+                    if record_trace:
+                        best_values.append((iteration - 1, best_value))
+                        best_values.append((iteration, current_state.current_value))
+                    best_value = current_state.current_value
+                    best_state = current_state
+                if (
+                    current_state.curr_item_index == len(items)
+                    or current_state.current_value + current_state.heuristic_value
+                    <= best_value
+                ):
+                    continue
+                next_frontier.extend(expand(current_state))
+                if observer is not None:
+                    observer.on_expansion(
+                        ExpansionEvent(
+                            iteration,
+                            len(next_frontier),
+                            nodes_generated,
+                            nodes_pruned,
+                            best_value,
+                            current_state.current_value + current_state.heuristic_value,
+                        )
+                    )
+            if len(next_frontier) > beam_width:
+                next_frontier.sort()  # best bound first
+                dropped_bound = max(
+                    dropped_bound,
+                    next_frontier[beam_width].current_value
+                    + next_frontier[beam_width].heuristic_value,
+                )
+                nodes_pruned += len(next_frontier) - beam_width
+                del next_frontier[beam_width:]
+            frontier = next_frontier
+        if record_trace:
+            best_values.append((iteration, best_value))  # append the last iteration
+        upper_bound = max(best_value, dropped_bound)
+        best_items = best_vector if best_state is None else best_state.picked_items
+        representation_vector = best_items + [False] * (len(items) - len(best_items))
+        return (
+            best_value,
+            representation_vector,
+            best_values,
+            upper_bound,
+            upper_bound <= best_value,
+        )
+
+    # best-first search keeps the states in a heap ordered by bound,
+    # depth-first branch-and-bound keeps them in a stack, which holds at most two states per depth
+    depth_first = search == "dfbnb"
+    queue = [initial_state]
+    is_optimal = True
     while queue:
-        current_state: State = heappop(queue)
+        # stop on an exhausted budget, the queue still holds the unexplored bounds
+        if out_of_budget():
+            is_optimal = False
+            if record_trace:
+                best_values.append((iteration, best_value))  # append the last iteration
+            break
+        current_state: State = queue.pop() if depth_first else heappop(queue)
+        # skip states dominated by one pushed after them
+        if table is not None and table.superseded(
+            current_state.curr_item_index,
+            current_state.current_weight,
+            current_state.current_value,
+        ):
+            continue
         # collect the best values for plotting
         iteration += 1
         # if it's the last item, check if it's the best solution
         if current_state.curr_item_index == len(items):
             if current_state.current_value > best_value:
-                best_values.append(
-                    (iteration - 1, best_value)
-                )  # append the previous best value
+                if record_trace:
+                    best_values.append(
+                        (iteration - 1, best_value)
+                    )  # append the previous best value
                 best_value = current_state.current_value
-                best_items = current_state.picked_items
-            best_values.append((iteration, best_value))  # append the last iteration
+                best_state = current_state
+            if depth_first:
+                continue
+            if record_trace:
+                best_values.append((iteration, best_value))  # append the last iteration
             break
 
-        # retrieve the item under consideration
-        item: Item = items[current_state.curr_item_index]
-
         # if the current state is better, update the best value
         if current_state.current_value > best_value:
-            best_values.append(
-                (iteration - 1, best_value)
-            )  # append the previous best value
+            if record_trace:
+                best_values.append(
+                    (iteration - 1, best_value)
+                )  # append the previous best value
+                best_values.append(
+                    (iteration, current_state.current_value)
+                )  # append the current best value
             best_value = current_state.current_value
-            best_items = current_state.picked_items
-            best_values.append((iteration, best_value))  # append the current best value
+            best_state = current_state
 
-        # if the current state is not promising, end the run
-        if current_state.current_value + current_state.heuristic_value < best_value:
-            best_values.append((iteration, best_value))  # append the last iteration
+        # if the current state is not promising, skip its subtree (depth-first) or end the run (best-first)
+        if depth_first:
+            if (
+                current_state.current_value + current_state.heuristic_value
+                <= best_value
+            ):
+                continue
+        elif current_state.current_value + current_state.heuristic_value < best_value:
+            if record_trace:
+                best_values.append((iteration, best_value))  # append the last iteration
             break
 
-        # create a state where the item is picked (if it fits)
-        if current_state.current_weight + item.weight <= total_capacity:
-            new_state = State(
-                current_state.current_value + item.value,
-                current_state.current_weight + item.weight,
-                current_state.remaining_capacity - item.weight,
-                heuristic(
-                    items,
-                    current_state.remaining_capacity - item.weight,
-                    current_state.curr_item_index + 1,
-                ),
-                current_state.curr_item_index + 1,
-                current_state.picked_items + [True],
+        children = expand(current_state)
+        if depth_first:
+            queue.extend(reversed(children))  # the picked child is explored first
+        else:
+            for child in children:
+                heappush(queue, child)
+
+        if observer is not None:
+            observer.on_expansion(
+                ExpansionEvent(
+                    iteration,
+                    len(queue),
+                    nodes_generated,
+                    nodes_pruned,
+                    best_value,
+                    current_state.current_value + current_state.heuristic_value,
+                )
             )
-            heappush(queue, new_state)
 
-        # create a state where the item is not picked
-        new_state = State(
-            current_state.current_value,
-            current_state.current_weight,
-            current_state.remaining_capacity,
-            heuristic(
-                items,
-                current_state.remaining_capacity,
-                current_state.curr_item_index + 1,
-            ),
-            current_state.curr_item_index + 1,
-            current_state.picked_items + [False],
-        )
-        heappush(queue, new_state)
+        # past the memory cap, explore the subtrees of the queued states one by one, best bound first
+        if (
+            not depth_first
+            and max_queue_size is not None
+            and len(queue) > max_queue_size
+        ):
+            depth_first = True
+            queue.sort(reverse=True)  # the best bound ends up on top of the stack
+    else:
+        # the queue ran empty, every remaining state was pruned before it was pushed
+        if record_trace:
+            best_values.append((iteration, best_value))  # append the last iteration
 
+    best_items = best_vector if best_state is None else best_state.picked_items
     representation_vector = best_items + [False] * (
         len(items) - len(best_items)
     )  # all other items are not taken into account
 
-    return best_value, representation_vector, best_values
+    upper_bound = best_value
+    if not is_optimal and queue:
+        # the heap is ordered by bound, so its top bounds every unexplored solution
+        top = (
+            max(queue, key=lambda state: state.current_value + state.heuristic_value)
+            if depth_first
+            else queue[0]
+        )
+        upper_bound = max(best_value, top.current_value + top.heuristic_value)
+    return best_value, representation_vector, best_values, upper_bound, is_optimal
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+import numpy as np
+from .typing import Item
+from .observers import Observer
+
+# default location of the cache, shared by the scripts of the repository
+DEFAULT_PATH = "results/solutions.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# how long opening a database waits for the other connections, in seconds
+TIMEOUT_SECONDS = 60
+
+
+def _canonical_order(items: list[Item]) -> list[int]:
+    return sorted(range(len(items)), key=lambda i: (items[i].value, items[i].weight))
+
+
+def instance_hash(total_capacity: int | float, items: list[Item]) -> str:
+    """
+    Canonical hash of an instance, independent of the order of the items.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack. \\
+        items (`list[Item]`): the list of items.
+    # Returns:
+        `str`: the hex digest of the instance.
+    """
+    canonical = json.dumps(
+        [
+            total_capacity,
+            [(items[i].value, items[i].weight) for i in _canonical_order(items)],
+        ]
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=20).hexdigest()
+
+
+def instance_key(
+    total_capacity: int | float, items: list[Item], solver: str, params: dict
+) -> tuple[str, list[int]]:
+    """
+    Canonical hash of an instance and the way it is solved, independent of the order of the items.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack. \\
+        items (`list[Item]`): the list of items. \\
+        solver (`str`): the name of the solver. \\
+        params (`dict`): the keyword arguments of the solver, they have to be JSON serializable.
+    # Returns:
+        `str`: the hex digest of the instance and the solver.
+        `list[int]`: the canonical order, the original indices of the items sorted by value and weight.
+    """
+    canonical = json.dumps(
+        [instance_hash(total_capacity, items), solver, params], sort_keys=True
+    )
+    return (
+        hashlib.blake2b(canonical.encode(), digest_size=20).hexdigest(),
+        _canonical_order(items),
+    )
+
+
+def _set_wal(connection: sqlite3.Connection) -> None:
+    """
+    Switch a database to write-ahead logging, the mode is stored in the file, so this is a no-op after the first time.
+    Changing the mode does not wait for the other connections like other statements do, so it is retried while they hold the file.
+    """
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    while True:
+        try:
+            (mode,) = connection.execute("PRAGMA journal_mode").fetchone()
+            if mode.lower() != "wal":
+                connection.execute("PRAGMA journal_mode=WAL")
+            return
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+class SolutionCache:
+    """
+    Persistent cache of solutions in an SQLite database, safe to share between processes.
+    Entries are evicted least recently used first once the database holds more than `max_bytes` of solutions.
+    # Fields:
+    hits (`int`) - the number of lookups answered by this instance. \\
+    misses (`int`) - the number of lookups this instance could not answer. \\
+    evictions (`int`) - the number of entries this instance removed.
+    """
+
+    def __init__(
+        self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(
+            path, timeout=TIMEOUT_SECONDS, isolation_level=None
+        )
+        _set_wal(self._connection)
+        self._connection.execute("""CREATE TABLE IF NOT EXISTS solutions (
+                key TEXT PRIMARY KEY,
+                value,
+                vector BLOB NOT NULL,
+                num_items INTEGER NOT NULL,
+                best_values BLOB NOT NULL,
+                elapsed REAL NOT NULL,
+                size INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL
+            )""")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)"
+        )
+
+    def get(self, key: str) -> tuple[int | float, list[bool], list, float] | None:
+        """
+        Look up a solution, the representation vector is in the canonical order of `instance_key`.
+        # Returns:
+            `tuple | None`: the value, the representation vector, the best values and the solving time, `None` on a miss.
+        """
+        row = self._connection.execute(
+            "SELECT value, vector, num_items, best_values, elapsed FROM solutions WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._connection.execute(
+            "UPDATE solutions SET hits = hits + 1, last_used = ? WHERE key = ?",
+            (time.time(), key),
+        )
+        value, vector, num_items, best_values, elapsed = row
+        vector = np.unpackbits(np.frombuffer(vector, dtype=np.uint8), count=num_items)
+        best_values = json.loads(zlib.decompress(best_values))
+        return value, vector.astype(bool).tolist(), best_values, elapsed
+
+    def put(
+        self,
+        key: str,
+        value: int | float,
+        vector: list[bool],
+        best_values: list,
+        elapsed: float,
+    ) -> None:
+        """Store a solution, the representation vector has to be in the canonical order of `instance_key`."""
+        packed_vector = np.packbits(np.array(vector, dtype=bool)).tobytes()
+        packed_best_values = zlib.compress(json.dumps(best_values).encode())
+        size = len(key) + len(packed_vector) + len(packed_best_values) + 64
+        self._connection.execute(
+            "INSERT OR REPLACE INTO solutions (key, value, vector, num_items, best_values, elapsed, size, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                value,
+                packed_vector,
+                len(vector),
+                packed_best_values,
+                elapsed,
+                size,
+                time.time(),
+            ),
+        )
+        self._evict()
+
+    def _evict(self) -> None:
+        (total_size,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM solutions"
+        ).fetchone()
+        if total_size <= self.max_bytes:
+            return
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            freed = 0
+            for key, size in self._connection.execute(
+                "SELECT key, size FROM solutions ORDER BY last_used"
+            ).fetchall():
+                if total_size - freed <= self.max_bytes:
+                    break
+                self._connection.execute("DELETE FROM solutions WHERE key = ?", (key,))
+                freed += size
+                self.evictions += 1
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        entries, total_size, total_hits = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM solutions"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "total_hits": total_hits,
+        }
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "SolutionCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def cached_solve(
+    total_capacity: int | float,
+    items: list[Item],
+    solver: str = "solve",
+    cache: SolutionCache | None = None,
+    observer: Observer | None = None,
+    **params,
+) -> tuple[int | float, list, list, float]:
+    """
+    Solve the knapsack problem exactly, or take the solution from the cache if the same instance was solved before
+    with the same solver and parameters. Unlike the solvers, `items` is never reordered.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack. \\
+        items (`list[Item]`): List of the items that are available to be picked. \\
+        solver (`"solve" | "a_star" | "dp"`): the exact solver to use. \\
+        cache (`SolutionCache | None`): the cache to use, `None` to solve without one. \\
+        observer (`Observer | None`): passed to the solver (except `dp`), it only sees the events of instances that are not cached. \\
+        params: keyword arguments of the solver, they are part of the cache key.
+    # Returns:
+        `int | float`: the total value of the items picked.
+        `list[bool]`: the best solution representation vector, in the order of `items`.
+        `list`: the best values over the course of the search, as returned by the solver.
+        `float`: the time the solver took, when the solution was computed.
+    """
+    from .a_star import a_star
+    from .dp import dp
+    from .engine import solve
+
+    solvers = {"solve": solve, "a_star": a_star, "dp": dp}
+    if solver not in solvers:
+        raise ValueError(f"unknown exact solver: {solver!r}")
+
+    if cache is not None:
+        key, order = instance_key(total_capacity, items, solver, params)
+        cached = cache.get(key)
+        if cached is not None:
+            value, canonical_vector, best_values, elapsed = cached
+            vector = [False] * len(items)
+            for i, picked in zip(order, canonical_vector):
+                vector[i] = picked
+            return value, vector, best_values, elapsed
+
+    # solve fresh copies, so that the position of every item can be found after `a_star` sorts them
+    copies = [Item(item.value, item.weight) for item in items]
+    index = {id(item): i for i, item in enumerate(copies)}
+    solver_params = dict(params)
+    if observer is not None and solver != "dp":
+        solver_params["observer"] = observer
+    start = time.perf_counter()
+    value, solved_vector, best_values = solvers[solver](
+        total_capacity, copies, **solver_params
+    )
+    elapsed = time.perf_counter() - start
+    vector = [False] * len(items)
+    for item, picked in zip(copies, solved_vector):
+        vector[index[id(item)]] = picked
+
+    if cache is not None:
+        cache.put(key, value, [vector[i] for i in order], best_values, elapsed)
+    return value, vector, best_values, elapsed
@@ -0,0 +1,102 @@
+import asyncio
+import itertools
+import json
+from .server import MAX_LINE
+from .typing import Item
+
+
+class SolveClient:
+    """
+    Client of `knapsack.server.SolveServer`. Requests are pipelined over one connection,
+    so many `solve` calls may be awaited concurrently.
+
+    >>> async with await SolveClient.connect("127.0.0.1", 8765) as client:
+    ...     response = await client.solve(capacity, items, timeout=1.0)
+    """
+
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._waiting: dict[int, asyncio.Future] = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(
+        cls, host: str | None = None, port: int | None = None, path: str | None = None
+    ) -> "SolveClient":
+        """Connect to the server listening on the Unix socket `path`, or on `host:port` otherwise."""
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    async def solve(
+        self,
+        total_capacity: int | float,
+        items: list[Item] | list[tuple[int | float, int | float]],
+        solver: str = "a_star",
+        timeout: float | None = None,
+        **params,
+    ) -> dict:
+        """
+        Solve an instance on the server.
+        # Args:
+            total_capacity (`int | float`): the total capacity of the knapsack. \\
+            items (`list[Item] | list[tuple]`): the items, or their (value, weight) pairs. \\
+            solver (`"a_star" | "pbil"`): the solver to run. \\
+            timeout (`float | None`): the time limit of the request, `a_star` returns the best solution found by then. \\
+            params: keyword arguments of the solver.
+        # Returns:
+            `dict`: the response of the server, see `SolveServer`.
+        """
+        request_id = next(self._ids)
+        request = {
+            "id": request_id,
+            "solver": solver,
+            "capacity": total_capacity,
+            "items": [
+                (item.value, item.weight) if isinstance(item, Item) else tuple(item)
+                for item in items
+            ],
+            "params": params,
+        }
+        if timeout is not None:
+            request["timeout"] = timeout
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(json.dumps(request).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def _receive(self) -> None:
+        try:
+            while line := await self._reader.readline():
+                response = json.loads(line)
+                future = self._waiting.pop(response["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+            error: Exception = ConnectionError("the server closed the connection")
+        except Exception as e:
+            error = e
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(error)
+        self._waiting.clear()
+
+    async def close(self) -> None:
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._receiver.cancel()
+
+    async def __aenter__(self) -> "SolveClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
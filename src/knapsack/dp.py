@@ -0,0 +1,61 @@
+from .typing import Item
+from numbers import Integral
+import numpy as np
+
+
+def is_integral(x: int | float) -> bool:
+    """
+    Check whether a weight (or capacity) can be used as an index of the dynamic programming table.
+    # Args:
+        x (`int | float`): the number to check.
+    # Returns:
+        `bool`: whether `x` is an integer or a float with no fractional part.
+    """
+    return isinstance(x, Integral) or float(x).is_integer()
+
+
+def dp(
+    total_capacity: int | float, items: list[Item]
+) -> tuple[int | float, list[bool], list[tuple[int, int | float]]]:
+    """
+    Solve the knapsack problem using capacity-indexed dynamic programming.
+    Only the best value for every capacity is kept in memory, the decisions are stored as one
+    packed bit row per item and are used to reconstruct the chosen items.
+    Unlike `a_star`, the order of `items` is left untouched.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack, any fractional part is ignored. \\
+        items (`list[Item]`): List of the items that are available to be picked, weights must be integral.
+
+    # Returns:
+        `int | float`: the total value of the items picked.
+        `list[bool]`: the best solution representation vector.
+        `list[tuple[int, int | float]]`: the best value after each processed item.
+    """
+    if not all(is_integral(item.weight) for item in items):
+        raise ValueError("dp requires integral item weights")
+    capacity = int(total_capacity)
+    if capacity < 0:
+        return 0, [False] * len(items), [(0, 0)]
+
+    values = np.array([item.value for item in items])
+    best = np.zeros(capacity + 1, dtype=values.dtype if len(items) else np.int64)
+    taken = np.zeros((len(items), (capacity + 8) // 8), dtype=np.uint8)
+    best_values: list[tuple[int, int | float]] = [(0, 0)]
+    for i, item in enumerate(items):
+        weight = int(item.weight)
+        if weight <= capacity:
+            candidate = best[: capacity + 1 - weight] + item.value
+            take = candidate > best[weight:]
+            best[weight:] = np.where(take, candidate, best[weight:])
+            taken[i] = np.packbits(np.concatenate((np.zeros(weight, dtype=bool), take)))
+        best_values.append((i + 1, best[capacity].item()))
+
+    # walk the decisions backwards to reconstruct the solution
+    representation_vector = [False] * len(items)
+    remaining_capacity = capacity
+    for i in range(len(items) - 1, -1, -1):
+        if taken[i, remaining_capacity >> 3] >> (7 - (remaining_capacity & 7)) & 1:
+            representation_vector[i] = True
+            remaining_capacity -= int(items[i].weight)
+
+    return best[capacity].item(), representation_vector, best_values
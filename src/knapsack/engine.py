@@ -0,0 +1,69 @@
+from .typing import Item
+from .a_star import a_star
+from .dp import dp, is_integral
+from .observers import Observer
+from .reduce import reduce
+from typing import Literal
+
+# the largest `len(items) * (capacity + 1)` table the dynamic programming solver is picked for
+DP_MAX_CELLS = 50_000_000
+
+
+def select_engine(total_capacity: int | float, items: list[Item]) -> str:
+    """
+    Pick the exact solver that is expected to be the fastest for the given instance.
+    Dynamic programming runs in a predictable `O(n * capacity)`, so it is used whenever the
+    weights are integral and the table fits in `DP_MAX_CELLS`, otherwise A* search is used.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack. \\
+        items (`list[Item]`): List of the items that are available to be picked.
+    # Returns:
+        `str`: name of the engine, `"dp"` or `"a_star"`.
+    """
+    if total_capacity < 0 or not all(is_integral(item.weight) for item in items):
+        return "a_star"
+    if len(items) * (int(total_capacity) + 1) > DP_MAX_CELLS:
+        return "a_star"
+    return "dp"
+
+
+def solve(
+    total_capacity: int | float,
+    items: list[Item],
+    engine: Literal["auto", "dp", "a_star"] = "auto",
+    preprocess: bool = False,
+    observer: Observer | None = None,
+) -> tuple[int | float, list[bool], list[tuple[int, int | float]]]:
+    """
+    Solve the knapsack problem exactly with the selected engine.
+    Note that `a_star` sorts `items` in place, the representation vector always refers to the
+    order of `items` after the call.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack. \\
+        items (`list[Item]`): List of the items that are available to be picked. \\
+        engine (`"auto" | "dp" | "a_star"`): the solver to use, `"auto"` picks one with `select_engine`. \\
+        preprocess (`bool`): whether to fix items with `knapsack.reduce` first and solve only the remaining core. \\
+        observer (`Observer | None`): receives the reduction statistics and the events of the A* search.
+
+    # Returns:
+        `int | float`: the total value of the items picked.
+        `list[bool]`: the best solution representation vector.
+        `list[tuple[int, int | float]]`: the best values over the course of the search.
+    """
+    if engine == "auto":
+        engine = select_engine(total_capacity, items)  # type: ignore
+    if engine == "dp":
+        if not preprocess:
+            return dp(total_capacity, items)
+        reduction = reduce(total_capacity, items)
+        if observer is not None:
+            observer.on_reduction(reduction)
+        value, vector, best_values = dp(reduction.total_capacity, reduction.items)
+        return (
+            value + reduction.fixed_value,
+            reduction.expand(vector),
+            [(i, v + reduction.fixed_value) for i, v in best_values],
+        )
+    if engine == "a_star":
+        return a_star(total_capacity, items, observer=observer, preprocess=preprocess)
+    raise ValueError(f"unknown engine: {engine!r}")
@@ -0,0 +1,184 @@
+from .reduce import Reduction
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class ExpansionEvent:
+    """
+    Emitted by `a_star` after every expanded state.
+    # Fields:
+    iteration (`int`) - the number of states popped from the queue so far. \\
+    heap_size (`int`) - the number of states waiting in the queue. \\
+    nodes_generated (`int`) - the number of states pushed onto the queue so far. \\
+    nodes_pruned (`int`) - the number of states discarded without being pushed. \\
+    best_value (`int | float`) - the value of the incumbent solution. \\
+    upper_bound (`int | float`) - the bound of the expanded state, no solution can be better.
+    """
+
+    iteration: int
+    heap_size: int
+    nodes_generated: int
+    nodes_pruned: int
+    best_value: int | float
+    upper_bound: int | float
+
+    @property
+    def gap(self) -> int | float:
+        """Difference between the upper bound and the incumbent."""
+        return self.upper_bound - self.best_value
+
+
+@dataclass(slots=True)
+class GenerationEvent:
+    """
+    Emitted by `pbil` after every generation.
+    # Fields:
+    generation (`int`) - the number of the generation, starting at 1. \\
+    best_value (`int | float`) - the best value found so far. \\
+    selected_values (`list[int | float]`) - the values of the best specimens of this generation. \\
+    entropy (`float`) - the mean binary entropy of the probability vector, in bits per item. \\
+    elapsed (`float`) - the time the generation took, in seconds. \\
+    cache_hits (`int`) - the number of specimens scored from the fitness cache so far. \\
+    cache_misses (`int`) - the number of specimens evaluated so far while the fitness cache was on. \\
+    population_size (`int`) - the number of specimens of this generation.
+    """
+
+    generation: int
+    best_value: int | float
+    selected_values: list[int | float]
+    entropy: float
+    elapsed: float
+    cache_hits: int = 0
+    cache_misses: int = 0
+    population_size: int = 0
+
+
+@dataclass(slots=True)
+class StopEvent:
+    """
+    Emitted by `pbil` once, when the run ends.
+    # Fields:
+    reason (`str`) - why the run ended: `"generations"` (all of them ran), `"threshold"` (the probability vector
+    stopped changing), `"stagnation"` (no better specimen for `patience` generations) or `"entropy"` (the entropy
+    of the probability vector fell below `min_entropy`). \\
+    generation (`int`) - the number of the last generation. \\
+    best_value (`int | float`) - the best value found. \\
+    evaluations (`int`) - the number of specimens sampled over the whole run.
+    """
+
+    reason: str
+    generation: int
+    best_value: int | float
+    evaluations: int
+
+
+class Observer:
+    """
+    Base class of solver observers, every hook is a no-op.
+    Solvers called without an observer do not build any events.
+    With `preprocess=True`, the events describe the search of the core instance,
+    so their values do not include the value of the items fixed by the reduction.
+    """
+
+    def on_expansion(self, event: ExpansionEvent) -> None:
+        pass
+
+    def on_generation(self, event: GenerationEvent) -> None:
+        pass
+
+    def on_reduction(self, reduction: Reduction) -> None:
+        """Called once when the solver runs with `preprocess=True`, before searching the core instance."""
+        pass
+
+    def on_stop(self, event: StopEvent) -> None:
+        pass
+
+
+@dataclass
+class TraceCollector(Observer):
+    """Keep every event."""
+
+    expansions: list[ExpansionEvent] = field(default_factory=list)
+    generations: list[GenerationEvent] = field(default_factory=list)
+    reduction: Reduction | None = None
+    stop: StopEvent | None = None
+
+    def on_expansion(self, event: ExpansionEvent) -> None:
+        self.expansions.append(event)
+
+    def on_generation(self, event: GenerationEvent) -> None:
+        self.generations.append(event)
+
+    def on_reduction(self, reduction: Reduction) -> None:
+        self.reduction = reduction
+
+    def on_stop(self, event: StopEvent) -> None:
+        self.stop = event
+
+
+@dataclass
+class DecimatedTraceCollector(Observer):
+    """Keep every `every`-th event, plus the most recent one of each kind."""
+
+    every: int = 100
+    expansions: list[ExpansionEvent] = field(default_factory=list)
+    generations: list[GenerationEvent] = field(default_factory=list)
+    last_expansion: ExpansionEvent | None = None
+    last_generation: GenerationEvent | None = None
+    reduction: Reduction | None = None
+    stop: StopEvent | None = None
+
+    def on_expansion(self, event: ExpansionEvent) -> None:
+        self.last_expansion = event
+        if event.iteration % self.every == 0:
+            self.expansions.append(event)
+
+    def on_generation(self, event: GenerationEvent) -> None:
+        self.last_generation = event
+        if event.generation % self.every == 0:
+            self.generations.append(event)
+
+    def on_reduction(self, reduction: Reduction) -> None:
+        self.reduction = reduction
+
+    def on_stop(self, event: StopEvent) -> None:
+        self.stop = event
+
+
+@dataclass
+class CounterCollector(Observer):
+    """Keep only counters and extremes, in constant memory."""
+
+    expansions: int = 0
+    generations: int = 0
+    max_heap_size: int = 0
+    nodes_generated: int = 0
+    nodes_pruned: int = 0
+    best_value: int | float = 0
+    total_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    reduction: dict[str, int | float] | None = None
+    stop_reason: str | None = None
+    evaluations: int = 0
+
+    def on_expansion(self, event: ExpansionEvent) -> None:
+        self.expansions += 1
+        self.max_heap_size = max(self.max_heap_size, event.heap_size)
+        self.nodes_generated = event.nodes_generated
+        self.nodes_pruned = event.nodes_pruned
+        self.best_value = event.best_value
+
+    def on_generation(self, event: GenerationEvent) -> None:
+        self.generations += 1
+        self.best_value = event.best_value
+        self.total_time += event.elapsed
+        self.cache_hits = event.cache_hits
+        self.cache_misses = event.cache_misses
+
+    def on_reduction(self, reduction: Reduction) -> None:
+        self.reduction = reduction.stats
+
+    def on_stop(self, event: StopEvent) -> None:
+        self.stop_reason = event.reason
+        self.evaluations = event.evaluations
@@ -1,8 +1,142 @@
 from .typing import Item
+from .observers import GenerationEvent, Observer, StopEvent
+from .reduce import reduce
+from collections import OrderedDict
 from functools import total_ordering
+from multiprocessing import shared_memory
+from queue import Empty
+import multiprocessing
 import numpy as np
 import random
-from tqdm import tqdm
+import time
+from typing import Literal
+
+
+def _generations(num_generations: int, show_progress: bool):
+    """Range of generation numbers, wrapped in a progress bar (and importing tqdm) only when requested."""
+    if not show_progress:
+        return range(1, num_generations + 1)
+    from tqdm import tqdm
+
+    return tqdm(range(1, num_generations + 1))
+
+
+# stop conditions used by `adaptive=True` when none are given
+ADAPTIVE_PATIENCE = 50
+ADAPTIVE_MIN_ENTROPY = 0.1
+
+
+def entropy(p: np.ndarray) -> float:
+    """
+    Mean binary entropy of a probability vector, in bits per item.
+    It is 1 for a uniform vector and 0 once every probability has collapsed to 0 or 1.
+    """
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return float(np.mean(-p * np.log2(p) - (1 - p) * np.log2(1 - p))) if len(p) else 0.0
+
+
+def diversity(selected: np.ndarray) -> float:
+    """
+    Mean disagreement of the selected specimens (a boolean matrix) about every item.
+    It is 0 when they are all the same and 1 when every item is picked by exactly half of them.
+    """
+    if selected.size == 0:
+        return 0.0
+    q = selected.mean(axis=0)
+    return float(np.mean(4 * q * (1 - q)))
+
+
+def _adapt_population(
+    population_size: int,
+    p_entropy: float,
+    elite_diversity: float,
+    min_size: int,
+    max_size: int,
+) -> int:
+    """
+    Grow the population while the best specimens agree much more than the still uncertain probability vector
+    (the search risks converging prematurely), shrink it once they agree because the vector has settled.
+    """
+    if elite_diversity >= p_entropy * 0.35:
+        return population_size
+    if p_entropy > 0.5:
+        population_size = population_size * 3 // 2
+    else:
+        population_size = population_size * 3 // 4
+    return min(max(population_size, min_size), max_size)
+
+
+class _Stopping:
+    """Stop conditions of a run, checked after every generation."""
+
+    def __init__(
+        self, threshold: float, patience: int | None, min_entropy: float | None
+    ) -> None:
+        self.threshold = threshold
+        self.patience = patience
+        self.min_entropy = min_entropy
+        self.p_prev: np.ndarray | None = None
+        self.best_value: int | float | None = None
+        self.stagnant = 0
+
+    def check(
+        self, p: np.ndarray, p_entropy: float, best_value: int | float
+    ) -> str | None:
+        """Return the reason to stop after this generation, `None` to go on."""
+        self.stagnant = (
+            0
+            if self.best_value is None or best_value > self.best_value
+            else self.stagnant + 1
+        )
+        self.best_value = best_value
+        reason = None
+        if self.p_prev is not None and np.linalg.norm(p - self.p_prev) < self.threshold:
+            reason = "threshold"  # the change is too small
+        elif self.patience is not None and self.stagnant >= self.patience:
+            reason = "stagnation"
+        elif self.min_entropy is not None and p_entropy < self.min_entropy:
+            reason = "entropy"
+        self.p_prev = np.copy(p)
+        return reason
+
+
+class FitnessCache:
+    """
+    Size-bounded LRU cache of specimens, keyed by the sampled representation vector (one byte per item),
+    it holds the value and the (repaired) representation vector of the specimen.
+    A cache is only valid for the instance it was filled with, `pbil` creates one per run.
+    # Fields:
+    maxsize (`int`) - the maximum number of cached values. \\
+    hits (`int`) - the number of specimens whose value was taken from the cache. \\
+    misses (`int`) - the number of specimens whose value had to be computed.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values: OrderedDict[bytes, tuple[int | float, list[bool]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, key: bytes) -> tuple[int | float, list[bool]] | None:
+        value = self._values.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._values.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: bytes, value: tuple[int | float, list[bool]]) -> None:
+        self._values[key] = value
+        if len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
 
 
 @total_ordering
@@ -12,17 +146,57 @@ class Specimen:
     # Fields:
     items (`list[bool]`) - the representation vector of items picked for the specimen.
     value (`int | float`) - the total value of the items picked (0 if the weight is too much).
+
+    With `repair_order` (the item indices by descending value/weight ratio), the sampled specimen is
+    repaired instead of penalized: the best picked items are kept while they fit, then the leftover
+    capacity is filled greedily.
     """
 
     items: list[bool]
     value: int | float
 
-    def __init__(self, items, probabilities, capacity_limit) -> None:
-        self.items = [random.random() < p for p in probabilities]
+    def __init__(
+        self,
+        items,
+        probabilities,
+        capacity_limit,
+        rng=random,
+        cache=None,
+        repair_order=None,
+    ) -> None:
+        self.items = [rng.random() < p for p in probabilities]
+        if cache is not None:
+            # look the sample up before any other per-item work, one byte per item
+            key = bytes(self.items)
+            cached = cache.get(key)
+            if cached is not None:
+                self.value, self.items = cached
+                return
+        if repair_order is not None:
+            self.items = self._repair(items, capacity_limit, repair_order)
         picked_items = [item for item, is_picked in zip(items, self.items) if is_picked]
         self.value = sum(item.value for item in picked_items)
         if sum(item.weight for item in picked_items) > capacity_limit:  # penalty
             self.value -= sum(item.value for item in items)
+        if cache is not None:
+            cache.put(key, (self.value, self.items))
+
+    def _repair(self, items, capacity_limit, repair_order) -> list[bool]:
+        picked = [False] * len(items)
+        remaining_capacity = capacity_limit
+        # keep the picked items with the best ratio while they fit
+        for i in repair_order:
+            if self.items[i]:
+                if items[i].weight > remaining_capacity:
+                    break
+                picked[i] = True
+                remaining_capacity -= items[i].weight
+        # fill the leftover capacity greedily
+        for i in repair_order:
+            if not picked[i] and items[i].weight <= remaining_capacity:
+                picked[i] = True
+                remaining_capacity -= items[i].weight
+        return picked
 
     def __repr__(self) -> str:
         return f"Specimen(value={self.value}, items={self.items})"
@@ -49,6 +223,17 @@ def pbil(
     mutation_std: float = 0.1,
     threshold: float = 1e-4,
     show_progress: bool = False,
+    engine: Literal["python", "numpy"] = "python",
+    seed: int | None = None,
+    observer: Observer | None = None,
+    record_trace: bool = True,
+    preprocess: bool = False,
+    cache_size: int = 0,
+    repair: bool = False,
+    adaptive: bool = False,
+    patience: int | None = None,
+    min_entropy: float | None = None,
+    initial_p: list[float] | np.ndarray | None = None,
 ) -> tuple[int | float, list[bool], list[list[int | float]], list[float]]:
     """
     Solve the knapsack problem using the Population-Based Incremental Learning (PBIL) algorithm.
@@ -63,28 +248,127 @@ def pbil(
         mutation_std (`float`): the standard deviation for the gaussian mutation (exceeding 0.33 is not advised).
         threshold (`float`): the threshold for the change in the probability vector to stop the algorithm.
         show_progress (`bool`): whether to display the progress bar.
+        engine (`"python" | "numpy"`): `"python"` evaluates every `Specimen` separately, `"numpy"` samples and scores the whole generation at once.
+        seed (`int | None`): seed of the random number generator used by the run, `None` for a fresh one.
+        observer (`Observer | None`): receives a `GenerationEvent` after every generation.
+        record_trace (`bool`): whether to collect the best specimen values of every generation.
+        preprocess (`bool`): whether to fix items with `knapsack.reduce` first and evolve only the remaining core.
+        cache_size (`int`): the size of the `FitnessCache` kept for the run, 0 to evaluate every specimen. Only the `"python"` engine
+            has one, the `"numpy"` engine scores a whole generation in two matrix products, faster than any lookup.
+        repair (`bool`): whether to repair overweight specimens (drop the lowest ratio items, then fill greedily) instead of penalizing them.
+        adaptive (`bool`): whether to resize the population every generation, between `max(2 * num_best, population_size // 4)` and `4 * population_size`,
+            from the entropy of the probability vector and the diversity of the best specimens. It also turns on the two stop conditions below,
+            with `ADAPTIVE_PATIENCE` and `ADAPTIVE_MIN_ENTROPY` unless they are given.
+        patience (`int | None`): stop after this many generations without a better specimen, `None` to never stop on stagnation.
+        min_entropy (`float | None`): stop once the entropy of the probability vector (see `entropy`) falls below it, `None` to never stop on it.
+        initial_p (`list[float] | np.ndarray | None`): the probability vector to start from (e.g. the one returned by an earlier run
+            on a similar instance), `None` to start from 1/2 for every item.
+        The reason the run stopped is reported to `observer` in a `StopEvent`.
     # Returns:
         `int | float`: best value found.
         `list[bool]`: the list of booleans indicating whether the item at the corresponding index is picked.
-        `list[list[int | float]]`: list of best specimen values in each generation.
+        `list[list[int | float]]`: list of best specimen values in each generation (empty if `record_trace` is off).
         `list[float]`: the probability vector.
     """
+    if preprocess:
+        reduction = reduce(total_capacity, items)
+        if observer is not None:
+            observer.on_reduction(reduction)
+        value, vector, best_values, core_p = pbil(
+            reduction.total_capacity,
+            reduction.items,
+            population_size=population_size,
+            num_generations=num_generations,
+            num_best=num_best,
+            learning_rate=learning_rate,
+            mutation_probability=mutation_probability,
+            mutation_std=mutation_std,
+            threshold=threshold,
+            show_progress=show_progress,
+            engine=engine,
+            seed=seed,
+            observer=observer,
+            record_trace=record_trace,
+            cache_size=cache_size,
+            repair=repair,
+            adaptive=adaptive,
+            patience=patience,
+            min_entropy=min_entropy,
+            initial_p=(
+                None
+                if initial_p is None
+                else [initial_p[i] for i in reduction.core_indices]
+            ),
+        )
+        # the fixed items keep a probability of exactly 1 or 0
+        p = [0.0] * len(items)
+        for i in reduction.fixed_in:
+            p[i] = 1.0
+        for i, probability in zip(reduction.core_indices, core_p):
+            p[i] = probability
+        return (
+            value + reduction.fixed_value,
+            reduction.expand(vector),
+            [[v + reduction.fixed_value for v in values] for values in best_values],
+            p,
+        )
+
+    if engine == "numpy":
+        if cache_size > 0:
+            raise ValueError(
+                "the numpy engine scores a generation faster than a fitness cache can look it up, use cache_size=0"
+            )
+        return _pbil_numpy(
+            total_capacity,
+            items,
+            population_size=population_size,
+            num_generations=num_generations,
+            num_best=num_best,
+            learning_rate=learning_rate,
+            mutation_probability=mutation_probability,
+            mutation_std=mutation_std,
+            threshold=threshold,
+            show_progress=show_progress,
+            seed=seed,
+            observer=observer,
+            record_trace=record_trace,
+            repair=repair,
+            adaptive=adaptive,
+            patience=patience,
+            min_entropy=min_entropy,
+            initial_p=initial_p,
+        )
+    if engine != "python":
+        raise ValueError(f"unknown engine: {engine!r}")
+    if adaptive:
+        patience = ADAPTIVE_PATIENCE if patience is None else patience
+        min_entropy = ADAPTIVE_MIN_ENTROPY if min_entropy is None else min_entropy
+
+    rng = random.Random(seed)
+    cache = FitnessCache(cache_size) if cache_size > 0 else None
     num_items = len(items)
-    p = np.full(num_items, 1 / 2)
-    p_prev = None
+    repair_order = _ratio_order(items) if repair else None
+    min_population = max(2 * num_best, population_size // 4)
+    max_population = 4 * population_size
+    stopping = _Stopping(threshold, patience, min_entropy)
+    stop_reason = "generations"
+    evaluations = 0
+    p = _initial_p(num_items, initial_p)
     best_value = 0
     best_specimen = None
     best_values: list[list[int | float]] = []
     # optionally display the progress bar
-    iterator = (
-        tqdm(range(1, num_generations + 1))
-        if show_progress
-        else range(1, num_generations + 1)
-    )
-    for i in iterator:
-        # generate population
+    iterator = _generations(num_generations, show_progress)
+    generation = 0
+    for generation in iterator:
+        if observer is not None:
+            start_time = time.perf_counter()
+        evaluations += population_size
+        # generate population, sampling against Python floats is faster than against NumPy scalars
+        probabilities = p.tolist()
         population = [
-            Specimen(items, p, total_capacity) for _ in range(population_size)
+            Specimen(items, probabilities, total_capacity, rng, cache, repair_order)
+            for _ in range(population_size)
         ]
         population = sorted(population, reverse=True)
         # save best specimen
@@ -94,7 +378,8 @@ def pbil(
         # select best specimens
         selected = population[:num_best]
         # keep track of best values
-        best_values.append([spec.value for spec in selected])
+        if record_trace:
+            best_values.append([spec.value for spec in selected])
 
         occurrence_counts = [
             sum(col) for col in zip(*[spec.items for spec in selected])
@@ -108,19 +393,592 @@ def pbil(
 
         # apply mutation
         for i in range(num_items):
-            if random.random() < mutation_probability:
-                mutation = random.gauss(0, mutation_std)
+            if rng.random() < mutation_probability:
+                mutation = rng.gauss(0, mutation_std)
                 p[i] = min(max(p[i] + mutation, 0), 1)
 
-        # additional stop condition
-        if p_prev is not None and np.linalg.norm(p - p_prev) < threshold:
-            # if the change is too small, stop
+        p_entropy = entropy(p)
+        if observer is not None:
+            observer.on_generation(
+                GenerationEvent(
+                    generation,
+                    best_value,
+                    [spec.value for spec in selected],
+                    p_entropy,
+                    time.perf_counter() - start_time,
+                    cache.hits if cache is not None else 0,
+                    cache.misses if cache is not None else 0,
+                    population_size,
+                )
+            )
+
+        # additional stop conditions
+        reason = stopping.check(p, p_entropy, best_value)
+        if reason is not None:
+            stop_reason = reason
             break
-        p_prev = np.copy(p)
+        if adaptive:
+            population_size = _adapt_population(
+                population_size,
+                p_entropy,
+                diversity(np.array([spec.items for spec in selected], dtype=bool)),
+                min_population,
+                max_population,
+            )
 
+    if observer is not None:
+        observer.on_stop(StopEvent(stop_reason, generation, best_value, evaluations))
     assert p is not None
     if best_specimen is None:
         representation_vector = [False] * len(items)
     else:
         representation_vector = best_specimen.items
     return best_value, representation_vector, best_values, p.tolist()
+
+
+def _initial_p(
+    num_items: int, initial_p: list[float] | np.ndarray | None
+) -> np.ndarray:
+    if initial_p is None:
+        return np.full(num_items, 1 / 2)
+    p = np.array(initial_p, dtype=float)
+    if p.shape != (num_items,):
+        raise ValueError(
+            f"initial_p has {p.size} probabilities, but there are {num_items} items"
+        )
+    return np.clip(p, 0, 1)
+
+
+def _ratio_order(items: list[Item]) -> list[int]:
+    """Indices of the items by descending value/weight ratio, the order in which repair considers them."""
+    return sorted(range(len(items)), key=lambda i: items[i].ratio, reverse=True)
+
+
+def _repair(
+    population: np.ndarray,
+    order: np.ndarray,
+    weights: np.ndarray,
+    total_capacity: int | float,
+) -> np.ndarray:
+    """
+    Make every row of a boolean population matrix feasible, see `Specimen` for the repair rule.
+    The rows are repaired together: dropping is a cumulative sum over the items in `order`,
+    filling is one pass over the items with a vector of the remaining capacities.
+    """
+    sorted_weights = weights[order]
+    picked = population[:, order]
+    # keep the picked items with the best ratio while they fit
+    picked &= np.cumsum(picked * sorted_weights, axis=1) <= total_capacity
+    remaining_capacity = total_capacity - picked @ sorted_weights
+    # fill the leftover capacity greedily, until no row can take even the lightest remaining item
+    lightest_from = np.minimum.accumulate(sorted_weights[::-1])[::-1]
+    for j, weight in enumerate(sorted_weights):
+        if not (remaining_capacity >= lightest_from[j]).any():
+            break
+        fits = (remaining_capacity >= weight) & ~picked[:, j]
+        picked[:, j] |= fits
+        remaining_capacity -= fits * weight
+    repaired = np.empty_like(population)
+    repaired[:, order] = picked
+    return repaired
+
+
+def _evaluate(
+    population: np.ndarray,
+    values: np.ndarray,
+    weights: np.ndarray,
+    total_capacity: int | float,
+    penalty: int | float,
+) -> np.ndarray:
+    """Score every row of a boolean population matrix, overweight specimens are penalized."""
+    fitness = population @ values
+    fitness[population @ weights > total_capacity] -= penalty
+    return fitness
+
+
+def _select(fitness: np.ndarray, num_selected: int) -> np.ndarray:
+    """Indices of the best specimens, best first (partial sort, then order only the selected ones)."""
+    selected = np.argpartition(-fitness, num_selected - 1)[:num_selected]
+    return selected[np.argsort(-fitness[selected], kind="stable")]
+
+
+def _learn(
+    rng: np.random.Generator,
+    p: np.ndarray,
+    selected: np.ndarray,
+    num_best: int,
+    learning_rate: float,
+    mutation_probability: float,
+    mutation_std: float,
+) -> np.ndarray:
+    """Move the probability vector towards the selected specimens and mutate it."""
+    # update the probability vector
+    occurrence_counts = selected.sum(axis=0)
+    p = (1 - learning_rate) * p + learning_rate * (occurrence_counts / num_best)
+
+    # apply mutation
+    mutated = rng.random(len(p)) < mutation_probability
+    p[mutated] = np.clip(
+        p[mutated] + rng.normal(0, mutation_std, np.count_nonzero(mutated)), 0, 1
+    )
+    return p
+
+
+def _pbil_numpy(
+    total_capacity: int | float,
+    items: list[Item],
+    population_size: int,
+    num_generations: int,
+    num_best: int,
+    learning_rate: float,
+    mutation_probability: float,
+    mutation_std: float,
+    threshold: float,
+    show_progress: bool,
+    seed: int | None,
+    observer: Observer | None,
+    record_trace: bool,
+    repair: bool,
+    adaptive: bool,
+    patience: int | None,
+    min_entropy: float | None,
+    initial_p: list[float] | np.ndarray | None,
+) -> tuple[int | float, list[bool], list[list[int | float]], list[float]]:
+    """
+    Array-based PBIL engine, see `pbil` for the meaning of the arguments and the returned tuple.
+    A generation is a `(population_size, num_items)` boolean matrix sampled against `p`,
+    scored with one matrix-vector product per values and weights.
+    """
+    rng = np.random.default_rng(seed)
+    num_items = len(items)
+    values = np.array([item.value for item in items])
+    weights = np.array([item.weight for item in items])
+    penalty = values.sum()
+    num_selected = min(num_best, population_size)
+    repair_order = np.array(_ratio_order(items), dtype=np.intp) if repair else None
+    if adaptive:
+        patience = ADAPTIVE_PATIENCE if patience is None else patience
+        min_entropy = ADAPTIVE_MIN_ENTROPY if min_entropy is None else min_entropy
+    min_population = max(2 * num_best, population_size // 4)
+    max_population = 4 * population_size
+    stopping = _Stopping(threshold, patience, min_entropy)
+    stop_reason = "generations"
+    evaluations = 0
+
+    p = _initial_p(num_items, initial_p)
+    best_value = 0
+    best_specimen = None
+    best_values: list[list[int | float]] = []
+    # optionally display the progress bar
+    iterator = _generations(num_generations, show_progress)
+    generation = 0
+    for generation in iterator:
+        if observer is not None:
+            start_time = time.perf_counter()
+        evaluations += population_size
+        # generate and score the population
+        population = rng.random((population_size, num_items)) < p
+        if repair_order is not None:
+            population = _repair(population, repair_order, weights, total_capacity)
+        fitness = _evaluate(population, values, weights, total_capacity, penalty)
+        selected = _select(fitness, num_selected)
+        # save best specimen
+        if fitness[selected[0]] > best_value:
+            best_value = fitness[selected[0]].item()
+            best_specimen = population[selected[0]]
+        # keep track of best values
+        if record_trace:
+            best_values.append(fitness[selected].tolist())
+
+        p = _learn(
+            rng,
+            p,
+            population[selected],
+            num_best,
+            learning_rate,
+            mutation_probability,
+            mutation_std,
+        )
+
+        p_entropy = entropy(p)
+        if observer is not None:
+            observer.on_generation(
+                GenerationEvent(
+                    generation,
+                    best_value,
+                    fitness[selected].tolist(),
+                    p_entropy,
+                    time.perf_counter() - start_time,
+                    0,
+                    0,
+                    population_size,
+                )
+            )
+
+        # additional stop conditions
+        reason = stopping.check(p, p_entropy, best_value)
+        if reason is not None:
+            stop_reason = reason
+            break
+        if adaptive:
+            population_size = _adapt_population(
+                population_size,
+                p_entropy,
+                diversity(population[selected]),
+                min_population,
+                max_population,
+            )
+
+    if observer is not None:
+        observer.on_stop(StopEvent(stop_reason, generation, best_value, evaluations))
+    if best_specimen is None:
+        representation_vector = [False] * num_items
+    else:
+        representation_vector = best_specimen.tolist()
+    return best_value, representation_vector, best_values, p.tolist()
+
+
+def pbil_batch(
+    instances: list[tuple[int | float, list[Item]]],
+    num_trials: int = 1,
+    population_size: int = 300,
+    num_generations: int = 1000,
+    num_best: int = 10,
+    learning_rate: float = 0.15,
+    mutation_probability: float = 0.1,
+    mutation_std: float = 0.1,
+    threshold: float = 1e-4,
+    show_progress: bool = False,
+    seed: int | None = None,
+) -> list[list[tuple[int | float, list[bool], list[list[int | float]], list[float]]]]:
+    """
+    Run PBIL on many knapsack instances (and many trials of each) at once.
+    Every (instance, trial) pair is one row of `(instance, specimen, item)` arrays, instances are
+    padded to a common item count with items that are never picked. Each row stops learning on its own,
+    once its probability vector changes less than `threshold`.
+    # Args:
+        instances (`list[tuple[int | float, list[Item]]]`): pairs of the total capacity and the list of items.
+        num_trials (`int`): the number of independent runs of every instance.
+        population_size, num_generations, num_best, learning_rate, mutation_probability,
+        mutation_std, threshold, show_progress, seed: see `pbil`.
+    # Returns:
+        `list[list[tuple]]`: for every instance, for every trial, the same tuple as `pbil` returns.
+    """
+    rng = np.random.default_rng(seed)
+    num_rows = len(instances) * num_trials
+    num_items = max((len(items) for _, items in instances), default=0)
+    item_counts = np.repeat([len(items) for _, items in instances], num_trials)
+    is_item = np.arange(num_items) < item_counts[:, None]
+    values = np.zeros(
+        (num_rows, num_items),
+        dtype=np.result_type(
+            *[item.value for _, items in instances for item in items], 0
+        ),
+    )
+    weights = np.zeros(
+        (num_rows, num_items),
+        dtype=np.result_type(
+            *[item.weight for _, items in instances for item in items], 0
+        ),
+    )
+    capacities = np.repeat([capacity for capacity, _ in instances], num_trials)
+    for i, (_, items) in enumerate(instances):
+        rows = slice(i * num_trials, (i + 1) * num_trials)
+        values[rows, : len(items)] = [item.value for item in items]
+        weights[rows, : len(items)] = [item.weight for item in items]
+    penalties = values.sum(axis=1)
+    num_selected = min(num_best, population_size)
+
+    p = np.where(is_item, 1 / 2, 0)
+    p_prev = None
+    active = np.ones(num_rows, dtype=bool)
+    best_value = np.zeros(num_rows, dtype=values.dtype)
+    best_specimen = np.zeros((num_rows, num_items), dtype=bool)
+    best_values: list[list[list[int | float]]] = [[] for _ in range(num_rows)]
+    # optionally display the progress bar
+    iterator = _generations(num_generations, show_progress)
+    for _ in iterator:
+        rows = np.flatnonzero(active)
+        # generate and score the population of every active row
+        population = rng.random((len(rows), population_size, num_items)) < p[rows, None]
+        fitness = np.matmul(population, values[rows, :, None])[..., 0]
+        overweight = (
+            np.matmul(population, weights[rows, :, None])[..., 0]
+            > capacities[rows, None]
+        )
+        fitness -= overweight * penalties[rows, None]
+        # select best specimens (partial sort, then order only the selected ones)
+        selected = np.argpartition(-fitness, num_selected - 1, axis=1)[:, :num_selected]
+        selected_fitness = np.take_along_axis(fitness, selected, axis=1)
+        order = np.argsort(-selected_fitness, axis=1, kind="stable")
+        selected = np.take_along_axis(selected, order, axis=1)
+        selected_fitness = np.take_along_axis(selected_fitness, order, axis=1)
+        # save best specimens
+        improved = selected_fitness[:, 0] > best_value[rows]
+        best_value[rows[improved]] = selected_fitness[improved, 0]
+        best_specimen[rows[improved]] = population[improved, selected[improved, 0]]
+        # keep track of best values
+        for row, generation_best in zip(rows, selected_fitness.tolist()):
+            best_values[row].append(generation_best)
+
+        # update the probability vectors
+        occurrence_counts = np.take_along_axis(
+            population, selected[:, :, None], axis=1
+        ).sum(axis=1)
+        p[rows] = (1 - learning_rate) * p[rows] + learning_rate * (
+            occurrence_counts / num_best
+        )
+
+        # apply mutation
+        mutated = (rng.random((len(rows), num_items)) < mutation_probability) & is_item[
+            rows
+        ]
+        mutation = rng.normal(0, mutation_std, (len(rows), num_items))
+        p[rows] = np.where(mutated, np.clip(p[rows] + mutation, 0, 1), p[rows])
+
+        # additional stop condition, evaluated separately for every row
+        if p_prev is not None:
+            converged = np.linalg.norm(p[rows] - p_prev[rows], axis=1) < threshold
+            active[rows[converged]] = False
+            if not active.any():
+                break
+        p_prev = p.copy()
+
+    results = []
+    for i, (_, items) in enumerate(instances):
+        trials = []
+        for row in range(i * num_trials, (i + 1) * num_trials):
+            n = len(items)
+            trials.append(
+                (
+                    best_value[row].item(),
+                    best_specimen[row, :n].tolist(),
+                    best_values[row],
+                    p[row, :n].tolist(),
+                )
+            )
+        results.append(trials)
+    return results
+
+
+class _IslandMemory:
+    """
+    Arrays shared by the islands through one shared memory block:
+    the probability vector, the best specimen and its value of every island,
+    and whether the island converged during the last epoch.
+    """
+
+    def __init__(self, num_islands, num_items, value_dtype, name=None):
+        self.shape = (num_islands, num_items, np.dtype(value_dtype).str)
+        sizes = [num_islands * num_items * 8, num_islands * num_items, num_islands * 8]
+        size = sum(sizes) + num_islands
+        self.block = shared_memory.SharedMemory(name, create=name is None, size=size)
+        offsets = np.cumsum([0] + sizes)
+        self.p = np.ndarray(
+            (num_islands, num_items), np.float64, self.block.buf, offsets[0]
+        )
+        self.best_specimen = np.ndarray(
+            (num_islands, num_items), np.bool_, self.block.buf, offsets[1]
+        )
+        self.best_value = np.ndarray(
+            num_islands, value_dtype, self.block.buf, offsets[2]
+        )
+        self.converged = np.ndarray(num_islands, np.bool_, self.block.buf, offsets[3])
+
+    def close(self):
+        del self.p, self.best_specimen, self.best_value, self.converged
+        self.block.close()
+
+
+def _island(
+    island,
+    memory_name,
+    memory_shape,
+    barrier,
+    results,
+    seed,
+    total_capacity,
+    values,
+    weights,
+    population_size,
+    num_generations,
+    num_best,
+    learning_rate,
+    mutation_probability,
+    mutation_std,
+    threshold,
+    migration_interval,
+    migration_rate,
+):
+    """Body of one island process of `pbil_islands`."""
+    num_islands, num_items, value_dtype = memory_shape
+    memory = _IslandMemory(num_islands, num_items, value_dtype, memory_name)
+    try:
+        rng = np.random.default_rng(seed)
+        penalty = values.sum()
+        num_selected = min(num_best, population_size)
+        p = np.full(num_items, 1 / 2)
+        p_prev = None
+        best_value = memory.best_value[island] = 0
+        best_values: list[list[int | float]] = []
+        converged = False
+        for generation in range(1, num_generations + 1):
+            if not converged:
+                population = rng.random((population_size, num_items)) < p
+                fitness = _evaluate(
+                    population, values, weights, total_capacity, penalty
+                )
+                selected = _select(fitness, num_selected)
+                if fitness[selected[0]] > best_value:
+                    best_value = fitness[selected[0]]
+                    memory.best_value[island] = best_value
+                    memory.best_specimen[island] = population[selected[0]]
+                best_values.append(fitness[selected].tolist())
+                p = _learn(
+                    rng,
+                    p,
+                    population[selected],
+                    num_best,
+                    learning_rate,
+                    mutation_probability,
+                    mutation_std,
+                )
+                converged = (
+                    p_prev is not None and np.linalg.norm(p - p_prev) < threshold
+                )
+                p_prev = p
+            if generation % migration_interval and generation != num_generations:
+                continue
+
+            # migration: publish, wait for every island, then learn from the previous one in the ring
+            memory.p[island] = p
+            memory.converged[island] = converged
+            barrier.wait()
+            if memory.converged.all():
+                break
+            neighbour = (island - 1) % num_islands
+            p = (1 - migration_rate) * p + migration_rate * memory.p[neighbour]
+            if memory.best_value[neighbour] > best_value:
+                p = (1 - learning_rate) * p + learning_rate * memory.best_specimen[
+                    neighbour
+                ]
+            converged, p_prev = False, p
+            # nobody may publish the next epoch before everyone has read this one
+            barrier.wait()
+        memory.p[island] = p
+        results.put((island, best_values))
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        memory.close()
+
+
+def pbil_islands(
+    total_capacity: int | float,
+    items: list[Item],
+    num_islands: int = 4,
+    migration_interval: int = 10,
+    migration_rate: float = 0.25,
+    population_size: int = 300,
+    num_generations: int = 1000,
+    num_best: int = 10,
+    learning_rate: float = 0.15,
+    mutation_probability: float = 0.1,
+    mutation_std: float = 0.1,
+    threshold: float = 1e-4,
+    seed: int | None = None,
+) -> tuple[int | float, list[bool], list[list[int | float]], list[float]]:
+    """
+    Run `num_islands` independent PBIL populations in separate processes, exchanging information every
+    `migration_interval` generations through shared memory. At every migration, each island blends its
+    probability vector with the one of the previous island in the ring (by `migration_rate`), and learns
+    from that island's best specimen if it is better than its own.
+    The run stops once every island converged (by the `threshold` norm) within the same epoch.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack.
+        items (`list[Item]`): the list of items.
+        num_islands (`int`): the number of populations, each one runs in its own process.
+        migration_interval (`int`): the number of generations between migrations.
+        migration_rate (`float`): the weight of the neighbour's probability vector in the blend.
+        population_size, num_generations, num_best, learning_rate, mutation_probability,
+        mutation_std, threshold, seed: see `pbil`, the settings apply to every island.
+    # Returns:
+        `int | float`: best value found by any island.
+        `list[bool]`: the list of booleans indicating whether the item at the corresponding index is picked.
+        `list[list[int | float]]`: the best specimen values of all islands in each generation.
+        `list[float]`: the mean probability vector of the islands.
+    """
+    num_items = len(items)
+    values = np.array([item.value for item in items])
+    weights = np.array([item.weight for item in items])
+    value_dtype = np.result_type(values, 0)
+    seeds = np.random.SeedSequence(seed).spawn(num_islands)
+
+    context = multiprocessing.get_context()
+    memory = _IslandMemory(num_islands, max(num_items, 1), value_dtype)
+    barrier = context.Barrier(num_islands)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=_island,
+            args=(
+                island,
+                memory.block.name,
+                memory.shape,
+                barrier,
+                results,
+                seeds[island],
+                total_capacity,
+                values if num_items else np.zeros(1, value_dtype),
+                weights if num_items else np.ones(1),
+                population_size,
+                num_generations,
+                num_best,
+                learning_rate,
+                mutation_probability,
+                mutation_std,
+                threshold,
+                migration_interval,
+                migration_rate,
+            ),
+        )
+        for island in range(num_islands)
+    ]
+    try:
+        for process in processes:
+            process.start()
+        traces: dict[int, list[list[int | float]]] = {}
+        while len(traces) < num_islands:
+            try:
+                island, best_values = results.get(timeout=0.1)
+                traces[island] = best_values
+            except Empty:
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    raise RuntimeError("a PBIL island process failed")
+        for process in processes:
+            process.join()
+
+        island = int(np.argmax(memory.best_value))
+        best_value = memory.best_value[island].item()
+        if best_value > 0:
+            representation_vector = memory.best_specimen[island, :num_items].tolist()
+        else:
+            representation_vector = [False] * num_items
+        p = memory.p[:, :num_items].mean(axis=0).tolist()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        memory.close()
+        memory.block.unlink()
+
+    # merge the traces, keeping the best `num_best` values of every generation
+    best_values = [
+        sorted(
+            (v for trace in traces.values() if g < len(trace) for v in trace[g]),
+            reverse=True,
+        )[:num_best]
+        for g in range(max(map(len, traces.values()), default=0))
+    ]
+    return best_value, representation_vector, best_values, p
@@ -1,20 +1,112 @@
-import pandas as pd
+import hashlib
+import os
+import numpy as np
 from .typing import Item
 
+# suffix of the binary cache written next to every CSV file that has been read
+CACHE_SUFFIX = ".npz"
 
-def read_data(file_path: str) -> tuple[int | float, int | float, list[Item]]:
+
+def _digest(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def write_cache(
+    file_path: str,
+    optimal_value: int | float,
+    total_capacity: int | float,
+    values: np.ndarray,
+    weights: np.ndarray,
+) -> None:
+    """
+    Write the binary cache of a CSV instance file, keyed by the file's modification time, size and hash.
+    Failing to write the cache (e.g. in a read-only directory) is not an error.
+    # Args:
+        file_path (`str`) - the path to the CSV file the cache belongs to. \\
+        optimal_value (`int | float`) - the optimal value stored in the header row. \\
+        total_capacity (`int | float`) - the capacity stored in the header row. \\
+        values (`np.ndarray`) - the values of the items. \\
+        weights (`np.ndarray`) - the weights of the items.
+    """
+    cache_path = file_path + CACHE_SUFFIX
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        stat = os.stat(file_path)
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                # the header row is kept as the first row, like in the CSV file
+                value=np.concatenate(([optimal_value], values)),
+                weight=np.concatenate(([total_capacity], weights)),
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                digest=_digest(file_path),
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_cache(file_path: str) -> tuple[np.ndarray, np.ndarray] | None:
+    cache_path = file_path + CACHE_SUFFIX
+    try:
+        stat = os.stat(file_path)
+        with np.load(cache_path) as cache:
+            if cache["size"] != stat.st_size:
+                return None
+            # a touched but unchanged file only costs a hash, not a parse
+            if cache["mtime_ns"] != stat.st_mtime_ns and str(
+                cache["digest"]
+            ) != _digest(file_path):
+                return None
+            return cache["value"], cache["weight"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def read_arrays(
+    file_path: str, cache: bool = True
+) -> tuple[int | float, int | float, np.ndarray, np.ndarray]:
+    """
+    Read data from a CSV file into typed arrays.
+    The first row holds the optimal value and the total capacity, the remaining rows hold the items.
+    # Args:
+        file_path (`str`) - the path to the CSV file. \\
+        cache (`bool`) - whether to use (and refresh) the binary cache stored next to the file.
+    # Returns:
+        result (`tuple[int | float, int | float, np.ndarray, np.ndarray]`) - the optimal value, total capacity, item values and item weights.
+    """
+    columns = _read_cache(file_path) if cache else None
+    if columns is None:
+        import pandas as pd  # only needed when the text has to be parsed
+
+        df = pd.read_csv(file_path)
+        columns = df.iloc[:, 0].to_numpy(), df.iloc[:, 1].to_numpy()
+        if cache:
+            write_cache(
+                file_path,
+                columns[0][0],
+                columns[1][0],
+                columns[0][1:],
+                columns[1][1:],
+            )
+    value, weight = columns
+    return value[0].item(), weight[0].item(), value[1:], weight[1:]
+
+
+def read_data(
+    file_path: str, cache: bool = True
+) -> tuple[int | float, int | float, list[Item]]:
     """
     Read data from a CSV file and return the optimal value, total capacity, and a list of items.
     # Args:
-        file_path (`str`) - the path to the CSV file.
+        file_path (`str`) - the path to the CSV file. \\
+        cache (`bool`) - whether to use (and refresh) the binary cache stored next to the file.
     # Returns:
         result (`tuple[int | float, int | float, list[Item]]`) - a tuple containing the optimal value, total capacity, and a list of items.
     """
-    df = pd.read_csv(file_path).astype("object")
-    optimal_value = df.iloc[0, 0]
-    total_capacity = df.iloc[0, 1]
-    items = []
-    for i in range(1, len(df)):
-        item = Item(df.iloc[i, 0], df.iloc[i, 1])
-        items.append(item)
-    return optimal_value, total_capacity, items  # type: ignore
+    optimal_value, total_capacity, values, weights = read_arrays(file_path, cache)
+    items = list(map(Item, values.tolist(), weights.tolist()))
+    return optimal_value, total_capacity, items
@@ -0,0 +1,122 @@
+from .typing import Item
+from bisect import bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
+
+
+@dataclass
+class Reduction:
+    """
+    Class to represent a knapsack instance reduced to its core.
+    # Fields:
+    total_capacity (`int | float`) - the capacity left for the core items. \\
+    items (`list[Item]`) - the core items, which still have to be decided, in their original order. \\
+    core_indices (`list[int]`) - the original index of every core item. \\
+    fixed_in (`list[int]`) - the original indices of the items that are in every optimal solution. \\
+    fixed_out (`list[int]`) - the original indices of the items that are in no optimal solution. \\
+    fixed_value (`int | float`) - the total value of the `fixed_in` items. \\
+    lower_bound (`int | float`) - the value of the greedy solution used by the reduction tests. \\
+    num_items (`int`) - the number of items of the original instance.
+    """
+
+    total_capacity: int | float
+    items: list[Item]
+    core_indices: list[int]
+    fixed_in: list[int]
+    fixed_out: list[int]
+    fixed_value: int | float
+    lower_bound: int | float
+    num_items: int
+
+    def expand(self, core_vector: list[bool]) -> list[bool]:
+        """
+        Map a representation vector of the core items back to the original items.
+        """
+        representation_vector = [False] * self.num_items
+        for i in self.fixed_in:
+            representation_vector[i] = True
+        for i, picked in zip(self.core_indices, core_vector):
+            representation_vector[i] = picked
+        return representation_vector
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "num_items": self.num_items,
+            "core_items": len(self.items),
+            "fixed_in": len(self.fixed_in),
+            "fixed_out": len(self.fixed_out),
+            "fixed_value": self.fixed_value,
+            "lower_bound": self.lower_bound,
+        }
+
+
+def reduce(total_capacity: int | float, items: list[Item]) -> Reduction:
+    """
+    Fix items to 0 or 1 with the classic LP-bound reduction tests.
+    Items heavier than the capacity are removed. Then, for every other item, the fractional (Dantzig) bound
+    is computed with the item forced out and forced in: if either bound is below the value of the greedy
+    solution, no optimal solution can make that choice, and the item is fixed to the other one.
+    `items` is left untouched.
+    # Args:
+        total_capacity (`int | float`): the total capacity of the knapsack. \\
+        items (`list[Item]`): List of the items that are available to be picked.
+
+    # Returns:
+        `Reduction`: the core instance and the mapping back to the original items.
+    """
+    fixed_out = [i for i, item in enumerate(items) if item.weight > total_capacity]
+    order = sorted(
+        (i for i, item in enumerate(items) if item.weight <= total_capacity),
+        key=lambda i: items[i].ratio,
+        reverse=True,
+    )
+    weights = [items[i].weight for i in order]
+    values = [items[i].value for i in order]
+    # prefix sums of weights and values, cumulative_*[k] covers the first k sorted items
+    cumulative_weights = list(accumulate(weights, initial=0))
+    cumulative_values = list(accumulate(values, initial=0))
+
+    def bound_without(j: int, capacity: int | float) -> int | float:
+        """Fractional bound of the sorted items without the `j`-th one."""
+        split = bisect_right(cumulative_weights, capacity) - 1
+        used_weight, used_value = cumulative_weights[split], cumulative_values[split]
+        if split >= j:  # the `j`-th item would be taken, look further without it
+            split = bisect_right(cumulative_weights, capacity + weights[j]) - 1
+            used_weight = cumulative_weights[split] - weights[j]
+            used_value = cumulative_values[split] - values[j]
+        if split < len(order):
+            used_value += items[order[split]].ratio * (capacity - used_weight)
+        return used_value
+
+    # greedy lower bound
+    lower_bound = 0
+    remaining_capacity = total_capacity
+    for weight, value in zip(weights, values):
+        if weight <= remaining_capacity:
+            remaining_capacity -= weight
+            lower_bound += value
+
+    fixed_in = []
+    for j, i in enumerate(order):
+        if bound_without(j, total_capacity) < lower_bound:
+            fixed_in.append(i)
+        elif values[j] + bound_without(j, total_capacity - weights[j]) < lower_bound:
+            fixed_out.append(i)
+
+    fixed_weight = sum(items[i].weight for i in fixed_in)
+    if fixed_weight > total_capacity:  # only possible through rounding errors
+        fixed_out = [i for i, item in enumerate(items) if item.weight > total_capacity]
+        fixed_in, fixed_weight = [], 0
+    fixed = set(fixed_in) | set(fixed_out)
+    core_indices = [i for i in range(len(items)) if i not in fixed]
+    return Reduction(
+        total_capacity=total_capacity - fixed_weight,
+        items=[items[i] for i in core_indices],
+        core_indices=core_indices,
+        fixed_in=sorted(fixed_in),
+        fixed_out=sorted(fixed_out),
+        fixed_value=sum(items[i].value for i in fixed_in),
+        lower_bound=lower_bound,
+        num_items=len(items),
+    )
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .typing import Item
+
+# `a_star` requests with at most this many items are grouped into batches, other requests get a worker of their own
+SMALL_ITEMS = 200
+# the largest accepted request line, in bytes
+MAX_LINE = 64 * 1024 * 1024
+# a solver that ignores the deadline (or is stuck in a batch) is given up on this much later
+TIMEOUT_GRACE_SECONDS = 1.0
+
+
+def _warm_up() -> None:
+    """Worker initializer, pay the import costs before the first request arrives."""
+    from . import a_star, pbil  # noqa: F401
+
+
+def _solve(request: dict) -> dict:
+    """
+    Solve one request in a worker process.
+    # Args:
+        request (`dict`): the request, with its absolute `deadline` (`time.time()` based) if it has a timeout.
+    # Returns:
+        `dict`: the response, either the solution or an `error`.
+    """
+    from .a_star import a_star_anytime
+    from .pbil import pbil
+
+    response = {"id": request.get("id")}
+    try:
+        capacity = request["capacity"]
+        items = [Item(value, weight) for value, weight in request["items"]]
+        params = request.get("params", {})
+        deadline = request.get("deadline")
+        start = time.perf_counter()
+        if request.get("solver", "a_star") == "a_star":
+            deadline_seconds = (
+                None if deadline is None else max(deadline - time.time(), 0)
+            )
+            # a_star sorts the items in place by ratio (stably), map the vector back through the same order
+            order = sorted(
+                range(len(items)), key=lambda i: items[i].ratio, reverse=True
+            )
+            value, vector, _, upper_bound, optimal = a_star_anytime(
+                capacity,
+                items,
+                deadline_seconds=deadline_seconds,
+                record_trace=False,
+                **params,
+            )
+            representation_vector = [False] * len(items)
+            for i, picked in zip(order, vector):
+                representation_vector[i] = picked
+            response.update(
+                value=value,
+                vector=representation_vector,
+                upper_bound=upper_bound,
+                optimal=optimal,
+            )
+        elif request["solver"] == "pbil":
+            # pbil cannot be stopped early, do not start it when nobody waits for the answer anymore
+            if deadline is not None and time.time() > deadline:
+                response["error"] = "timeout"
+                return response
+            params = {"engine": "numpy", **params}
+            value, vector, _, _ = pbil(capacity, items, record_trace=False, **params)
+            response.update(value=value, vector=vector, optimal=False)
+        else:
+            raise ValueError(f"unknown solver: {request['solver']!r}")
+        response["elapsed"] = time.perf_counter() - start
+    except Exception as e:
+        response["error"] = f"{type(e).__name__}: {e}"
+    return response
+
+
+def _is_number(x) -> bool:
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+
+def _validate(request: dict) -> None:
+    """Check the fields the server itself reads, raise a `ValueError` describing the first invalid one."""
+    if "capacity" not in request or not _is_number(request["capacity"]):
+        raise ValueError("capacity has to be a number")
+    items = request.get("items")
+    if not isinstance(items, list) or not all(
+        isinstance(item, list) and len(item) == 2 and all(map(_is_number, item))
+        for item in items
+    ):
+        raise ValueError("items has to be a list of [value, weight] pairs of numbers")
+    timeout = request.get("timeout")
+    if timeout is not None and (not _is_number(timeout) or timeout < 0):
+        raise ValueError("timeout has to be a non-negative number")
+    if not isinstance(request.get("params", {}), dict):
+        raise ValueError("params has to be an object")
+
+
+def _solve_batch(requests: list[dict]) -> list[dict]:
+    return [_solve(request) for request in requests]
+
+
+class SolveServer:
+    """
+    Asyncio solve server speaking JSON lines over TCP or a Unix socket, backed by a warm process pool.
+    Every request line is a JSON object:
+    `{"id": ..., "solver": "a_star" | "pbil", "capacity": C, "items": [[value, weight], ...], "params": {...}, "timeout": seconds}`,
+    only `capacity` and `items` are required. Each response line echoes the `id` and carries either `value`, `vector`
+    (in the order of the request's items), `optimal` (and `upper_bound` for `a_star`), and `elapsed`, or an `error`.
+    Responses on one connection may come out of order.
+    # Args:
+        max_workers (`int | None`): the number of worker processes, `None` for the number of CPUs. \\
+        max_pending (`int`): the number of requests accepted but not answered yet, reading from the sockets stops beyond it. \\
+        batch_size (`int`): the largest number of small requests sent to a worker at once. \\
+        batch_delay (`float`): how long a small request may wait for others to fill its batch, in seconds. \\
+        small_items (`int`): the largest number of items of an `a_star` request that may be batched. \\
+        default_timeout (`float | None`): the timeout of requests that do not set one, `None` for no limit.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        max_pending: int = 1024,
+        batch_size: int = 32,
+        batch_delay: float = 0.002,
+        small_items: int = SMALL_ITEMS,
+        default_timeout: float | None = None,
+    ) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.small_items = small_items
+        self.default_timeout = default_timeout
+        self.stats = {"requests": 0, "batches": 0, "timeouts": 0, "errors": 0}
+        self._executor: ProcessPoolExecutor | None = None
+        self._server: asyncio.base_events.Server | None = None
+        self._pending: asyncio.Semaphore | None = None
+        self._small: asyncio.Queue | None = None
+        self._batcher: asyncio.Task | None = None
+
+    async def start(
+        self, host: str | None = None, port: int | None = None, path: str | None = None
+    ) -> None:
+        """Start the workers and listen on the Unix socket `path`, or on `host:port` otherwise."""
+        loop = asyncio.get_running_loop()
+        self._executor = ProcessPoolExecutor(self.max_workers, initializer=_warm_up)
+        # spawn every worker now, not on the first requests
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, time.sleep, 0.05)
+                for _ in range(self.max_workers)
+            )
+        )
+        self._pending = asyncio.Semaphore(self.max_pending)
+        self._small = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_small())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle, path, limit=MAX_LINE
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._handle, host, port, limit=MAX_LINE
+            )
+
+    @property
+    def sockets(self):
+        assert self._server is not None
+        return self._server.sockets
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        assert self._pending is not None
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                # backpressure: with `max_pending` requests in flight, stop reading
+                await self._pending.acquire()
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    line = b""
+                if not line:
+                    self._pending.release()
+                    break
+                task = asyncio.create_task(self._respond(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _respond(
+        self, line: bytes, writer: asyncio.StreamWriter, write_lock: asyncio.Lock
+    ) -> None:
+        assert self._pending is not None
+        try:
+            try:
+                response = await self._process(line)
+            except Exception as e:
+                # never leave a request unanswered, the client would wait for it forever
+                response = {"id": None, "error": f"{type(e).__name__}: {e}"}
+            if "error" in response:
+                self.stats["errors"] += 1
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._pending.release()
+
+    async def _process(self, line: bytes) -> dict:
+        assert self._executor is not None and self._small is not None
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request has to be a JSON object")
+            request_id = request.get("id")
+            _validate(request)
+        except ValueError as e:
+            return {"id": request_id, "error": f"invalid request: {e}"}
+        self.stats["requests"] += 1
+        timeout = request.pop("timeout", self.default_timeout)
+        if timeout is not None:
+            request["deadline"] = time.time() + timeout
+
+        loop = asyncio.get_running_loop()
+        if (
+            request.get("solver", "a_star") == "a_star"
+            and len(request.get("items", ())) <= self.small_items
+        ):
+            future = loop.create_future()
+            self._small.put_nowait((request, future))
+        else:
+            future = loop.run_in_executor(self._executor, _solve, request)
+        if timeout is None:
+            return await future
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(future), timeout + TIMEOUT_GRACE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return {"id": request.get("id"), "error": "timeout"}
+
+    async def _batch_small(self) -> None:
+        """Group the small requests, waiting at most `batch_delay` for a batch to fill up."""
+        assert self._executor is not None and self._small is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._small.get()]
+            flush_at = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(
+                        await asyncio.wait_for(
+                            self._small.get(), max(flush_at - loop.time(), 0)
+                        )
+                    )
+                except asyncio.TimeoutError:
+                    break
+            self.stats["batches"] += 1
+            results = loop.run_in_executor(
+                self._executor, _solve_batch, [request for request, _ in batch]
+            )
+            results.add_done_callback(
+                lambda results, batch=batch: self._deliver(results, batch)
+            )
+
+    @staticmethod
+    def _deliver(results: asyncio.Future, batch: list) -> None:
+        for i, (request, future) in enumerate(batch):
+            if future.done():
+                continue
+            if results.cancelled():
+                future.cancel()
+            elif results.exception() is not None:
+                future.set_result(
+                    {"id": request.get("id"), "error": repr(results.exception())}
+                )
+            else:
+                future.set_result(results.result()[i])
+
+
+async def serve(
+    host: str | None = None,
+    port: int | None = None,
+    path: str | None = None,
+    **kwargs,
+) -> None:
+    """Run a `SolveServer` until cancelled or sent SIGTERM, `kwargs` are passed to `SolveServer`."""
+    server = SolveServer(**kwargs)
+    await server.start(host, port, path)
+    # stop like on Ctrl+C, so that the worker processes are shut down with the server
+    task = asyncio.current_task()
+    assert task is not None
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    print(
+        "listening on",
+        ", ".join(str(socket.getsockname()) for socket in server.sockets),
+        flush=True,
+    )
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the knapsack solvers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--max-pending", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--batch-delay", type=float, default=0.002)
+    parser.add_argument("--small-items", type=int, default=SMALL_ITEMS)
+    parser.add_argument("--timeout", type=float)
+    args = parser.parse_args()
+    try:
+        asyncio.run(
+            serve(
+                args.host,
+                args.port,
+                args.unix,
+                max_workers=args.workers,
+                max_pending=args.max_pending,
+                batch_size=args.batch_size,
+                batch_delay=args.batch_delay,
+                small_items=args.small_items,
+                default_timeout=args.timeout,
+            )
+        )
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
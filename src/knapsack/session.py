@@ -0,0 +1,227 @@
+from .typing import Item
+from bisect import bisect_left, bisect_right
+from math import floor
+from typing import Literal
+
+# the probabilities carried over to the next `pbil` run are kept this far from 0 and 1,
+# otherwise the run could not move away from the previous solution
+PBIL_RESTART_MARGIN = 0.05
+
+
+class SolverSession:
+    """
+    Stateful solver of an instance that changes a little between solves (the capacity moves,
+    a few items are added, removed or updated). The items are kept sorted by value-to-weight ratio,
+    so that `a_star` does not sort them again, and every solve starts from the previous solution:
+    repaired to fit the new capacity and filled up greedily, it is the incumbent of `a_star`,
+    and the last probability vector is the initial `p` of `pbil`. An upper bound on the optimum is carried
+    across the deltas too (removing an item or lowering the capacity keeps it, adding an item raises it
+    by the item's value). When the repaired solution reaches it, or the fractional (Dantzig) bound
+    of the new instance, it is returned without a search.
+    Unlike the solvers, the list of items passed in is never reordered.
+
+    >>> session = SolverSession(capacity, items)
+    >>> value, vector, _ = session.solve()
+    >>> session.set_capacity(capacity - 10)
+    >>> new_item = session.update(items[0], value=12)
+    >>> value, vector, _ = session.solve()
+    # Fields:
+    total_capacity (`int | float`) - the current capacity of the knapsack. \\
+    items (`list[Item]`) - the current items, sorted by descending value-to-weight ratio, the order of the representation vectors. \\
+    value (`int | float`) - the value of the last solution. \\
+    vector (`list[bool]`) - the last solution representation vector, updated by the deltas (new items are not picked). \\
+    optimal (`bool`) - whether the last solution is proven optimal and no delta was applied since. \\
+    searches (`int`) - the number of solves that ran a solver, the others were answered from the bound.
+    """
+
+    def __init__(
+        self,
+        total_capacity: int | float,
+        items: list[Item],
+        solver: Literal["a_star", "pbil"] = "a_star",
+        **params,
+    ) -> None:
+        """
+        # Args:
+            total_capacity (`int | float`): the total capacity of the knapsack. \\
+            items (`list[Item]`): the items of the instance. \\
+            solver (`"a_star" | "pbil"`): the solver used by `solve`. \\
+            params: keyword arguments of the solver, e.g. `deadline_seconds` or `num_generations`.
+        """
+        if solver not in ("a_star", "pbil"):
+            raise ValueError(f"unknown solver: {solver!r}")
+        self.solver = solver
+        self.params = params
+        self.total_capacity = total_capacity
+        self.items = sorted(items, key=lambda item: item.ratio, reverse=True)
+        # negated ratios, ascending, to find positions with `bisect`
+        self._keys = [-item.ratio for item in self.items]
+        self.vector = [False] * len(self.items)
+        self._p: list[float] | None = None
+        self.value: int | float = 0
+        self.optimal = False
+        self.searches = 0
+        # an upper bound on the optimum of the current instance, `None` when unknown
+        self._upper_bound: int | float | None = None
+
+    def _index(self, item: Item) -> int:
+        """Position of `item` (the same object) in `items`, found among the items of the same ratio."""
+        start = bisect_left(self._keys, -item.ratio)
+        end = bisect_right(self._keys, -item.ratio)
+        for i in range(start, end):
+            if self.items[i] is item:
+                return i
+        raise ValueError(f"{item!r} is not in the session")
+
+    def add(self, item: Item, picked: bool = False) -> None:
+        """Add an item, it is not part of the current solution unless `picked`."""
+        i = bisect_right(self._keys, -item.ratio)
+        self.items.insert(i, item)
+        self._keys.insert(i, -item.ratio)
+        self.vector.insert(i, picked)
+        if self._p is not None:
+            self._p.insert(i, 1 / 2)
+        if self._upper_bound is not None:
+            self._upper_bound += item.value
+        self.optimal = False
+
+    def remove(self, item: Item) -> bool:
+        """
+        Remove an item (the same object that was added).
+        # Returns:
+            `bool`: whether the item was part of the current solution.
+        """
+        i = self._index(item)
+        del self.items[i], self._keys[i]
+        picked = self.vector.pop(i)
+        if self._p is not None:
+            del self._p[i]
+        self.optimal = False
+        return picked
+
+    def update(
+        self,
+        item: Item,
+        value: int | float | None = None,
+        weight: int | float | None = None,
+    ) -> Item:
+        """
+        Replace an item by one with a new value and/or weight, keeping its place in the current solution.
+        # Returns:
+            `Item`: the new item, to be used by later deltas.
+        """
+        i = self._index(item)
+        p = None if self._p is None else self._p[i]
+        picked = self.remove(item)
+        new_item = Item(
+            item.value if value is None else value,
+            item.weight if weight is None else weight,
+        )
+        self.add(new_item, picked)
+        if p is not None:
+            self._p[self._index(new_item)] = p
+        return new_item
+
+    def set_capacity(self, total_capacity: int | float) -> None:
+        if total_capacity != self.total_capacity:
+            if total_capacity > self.total_capacity:
+                self._upper_bound = None
+            self.total_capacity = total_capacity
+            self.optimal = False
+
+    def bounds(self) -> tuple[int | float, int | float]:
+        """
+        # Returns:
+            `int | float`: the value of the greedy solution, a lower bound on the optimum.
+            `int | float`: the fractional (Dantzig) bound, an upper bound on the optimum (rounded down for integer values).
+        """
+        lower_bound = 0
+        upper_bound = None
+        capacity = self.total_capacity
+        for item in self.items:
+            if item.weight <= capacity:
+                capacity -= item.weight
+                lower_bound += item.value
+            elif upper_bound is None:
+                # the first item that does not fit whole is the split item of the fractional bound
+                upper_bound = lower_bound + item.ratio * capacity
+        if upper_bound is None:
+            return lower_bound, lower_bound
+        if all(float(item.value).is_integer() for item in self.items):
+            upper_bound = floor(upper_bound)
+        return lower_bound, upper_bound
+
+    def _repaired(self) -> tuple[int | float, list[bool]]:
+        """
+        The current solution made feasible: the picked items of the lowest ratio are dropped until it fits,
+        then the items that still fit are added in ratio order.
+        """
+        vector = list(self.vector)
+        weight = sum(item.weight for item, picked in zip(self.items, vector) if picked)
+        for i in range(len(vector) - 1, -1, -1):
+            if weight <= self.total_capacity:
+                break
+            if vector[i]:
+                vector[i] = False
+                weight -= self.items[i].weight
+        value = 0
+        for i, item in enumerate(self.items):
+            if not vector[i] and weight + item.weight <= self.total_capacity:
+                vector[i] = True
+                weight += item.weight
+            if vector[i]:
+                value += item.value
+        return value, vector
+
+    def solve(self) -> tuple[int | float, list[bool], list]:
+        """
+        Solve the current instance, starting from the previous solution.
+        # Returns:
+            `int | float`: the total value of the items picked.
+            `list[bool]`: the solution representation vector, in the order of `items`.
+            `list`: the best values over the course of the search, as returned by the solver (empty without a search).
+        """
+        from .a_star import a_star_anytime
+        from .pbil import pbil
+
+        if self.optimal:
+            return self.value, list(self.vector), []
+        value, vector = self._repaired()
+        _, upper_bound = self.bounds()
+        if self._upper_bound is not None:
+            upper_bound = min(upper_bound, self._upper_bound)
+        if value >= upper_bound:
+            self.value, self.vector, self.optimal = value, vector, True
+            return value, list(vector), []
+
+        self.searches += 1
+        if self.solver == "a_star":
+            value, vector, best_values, self._upper_bound, self.optimal = (
+                a_star_anytime(
+                    self.total_capacity,
+                    self.items,
+                    incumbent=vector,
+                    presorted=True,
+                    **self.params,
+                )
+            )
+        else:
+            initial_p = None
+            if self._p is not None:
+                initial_p = [
+                    min(max(p, PBIL_RESTART_MARGIN), 1 - PBIL_RESTART_MARGIN)
+                    for p in self._p
+                ]
+            incumbent_value, incumbent = value, vector
+            value, vector, best_values, self._p = pbil(
+                self.total_capacity,
+                list(self.items),
+                initial_p=initial_p,
+                **self.params,
+            )
+            # pbil does not know the repaired solution, keep it if it is still better
+            if incumbent_value > value:
+                value, vector = incumbent_value, incumbent
+            self.optimal = False
+        self.value, self.vector = value, vector
+        return value, list(vector), best_values
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import knapsack
+
+from pathlib import Path
+from knapsack.client import SolveClient
+
+DATASETS = ["small", "uncorrelated", "medium_correlation", "strong_correlation"]
+
+
+def load_instances(datasets: list[str], max_items: int):
+    instances = []
+    for dataset in datasets:
+        for filepath in sorted(Path("data").glob(f"{dataset}/*.csv")):
+            optimal, capacity, items = knapsack.read_data(str(filepath))
+            if len(items) <= max_items:
+                instances.append((filepath.name, optimal, capacity, items))
+    return instances
+
+
+async def start_local_server(path: str, workers: int | None) -> subprocess.Popen:
+    """Start `knapsack.server` on a Unix socket in a separate process and wait until it accepts connections."""
+    command = [sys.executable, "-m", "knapsack.server", "--unix", path]
+    if workers is not None:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command, cwd=Path(__file__).parent)
+    while not os.path.exists(path):
+        if process.poll() is not None:
+            raise RuntimeError("the server failed to start")
+        await asyncio.sleep(0.05)
+    return process
+
+
+async def run(args) -> dict:
+    instances = load_instances(args.datasets, args.max_items)
+    random.seed(args.seed)
+    schedule = [random.choice(instances) for _ in range(args.requests)]
+
+    latencies = []
+    counts = {"ok": 0, "optimal": 0, "wrong": 0, "timeouts": 0, "errors": 0}
+
+    async def worker(client: SolveClient, jobs: list):
+        for name, optimal, capacity, items in jobs:
+            start = time.perf_counter()
+            response = await client.solve(
+                capacity, items, solver=args.solver, timeout=args.timeout
+            )
+            latencies.append(time.perf_counter() - start)
+            if response.get("error") == "timeout":
+                counts["timeouts"] += 1
+            elif "error" in response:
+                counts["errors"] += 1
+                print(f"{name}: {response['error']}")
+            else:
+                counts["ok"] += 1
+                counts["optimal"] += bool(response["optimal"])
+                # an optimal answer has to match the value stored in the file
+                if response["optimal"] and abs(response["value"] - optimal) > 1e-3:
+                    counts["wrong"] += 1
+
+    clients = [
+        await SolveClient.connect(args.host, args.port, args.unix)
+        for _ in range(args.connections)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            worker(clients[i % len(clients)], schedule[i :: args.concurrency])
+            for i in range(args.concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    return {
+        "requests": len(latencies),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "p99": float(np.percentile(latencies, 99)),
+        **counts,
+    }
+
+
+async def main_async(args):
+    server = None
+    if args.host is None and args.unix is None:
+        args.unix = os.path.join(tempfile.mkdtemp(), "knapsack.sock")
+        server = await start_local_server(args.unix, args.workers)
+    try:
+        summary = await run(args)
+    finally:
+        if server is not None:
+            # like Ctrl+C, the server then shuts its worker processes down before exiting
+            server.send_signal(signal.SIGINT)
+            server.wait()
+    print(
+        f"{summary['requests']} requests in {summary['elapsed']:.2f}s, {summary['throughput']:.1f} req/s"
+    )
+    print(
+        f"latency p50 {summary['p50'] * 1000:.1f} ms, p95 {summary['p95'] * 1000:.1f} ms, p99 {summary['p99'] * 1000:.1f} ms"
+    )
+    print(
+        f"ok {summary['ok']} (optimal {summary['optimal']}, wrong {summary['wrong']}), timeouts {summary['timeouts']}, errors {summary['errors']}"
+    )
+    if summary["wrong"] or summary["errors"]:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test a knapsack solve server, a local one is started unless --host or --unix is given."
+    )
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--solver", default="a_star", choices=["a_star", "pbil"])
+    parser.add_argument("--datasets", nargs="+", default=DATASETS)
+    parser.add_argument("--max-items", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
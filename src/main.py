@@ -1,37 +1,48 @@
 import knapsack
+import knapsack.cache
 import os
-import json
-from time import time
 import matplotlib.pyplot as plt
 import numpy as np
+import results_store
 
 FILEPATH = "data/small/"
-RESULT_FILE = "results/a_star/strong_correlation.jsonl"
 
 
-def save_results(fname, optimal, time, best_values):
-    res = {
-        "filename": fname,
-        "optimal": optimal,
-        "time": time,
-        "best_values": best_values,
-    }
-    with open(RESULT_FILE, "a") as f:
-        json.dump(res, f)
-        f.write("\n")
-
-
-def main():
-    FILENAMES = os.listdir(FILEPATH)
-    for fname in FILENAMES:
-        optimal, capacity, items = knapsack.read_data(FILEPATH + fname)
-        start = time()
-        value, taken_items, best_values = knapsack.a_star(capacity, items)
-        end = time()
-        print(
-            f"Expected value: {optimal}, Computed value: {value}, Iterations: {best_values[-1][0]}"
-        )
-        save_results(fname, optimal, end - start, best_values)
+def main(
+    results_path: str = results_store.DEFAULT_PATH,
+    solution_cache: str = knapsack.cache.DEFAULT_PATH,
+):
+    """
+    Solve every instance in `FILEPATH` with A* and record the runs in the results store at `results_path`.
+    Instances solved by an earlier run are taken from the `SolutionCache` at `solution_cache`,
+    the time of the first solve is reported.
+    """
+    # the directory also holds the binary caches of `read_data`
+    FILENAMES = sorted(f for f in os.listdir(FILEPATH) if f.endswith(".csv"))
+    with (
+        knapsack.SolutionCache(solution_cache) as cache,
+        results_store.ResultsStore(results_path) as store,
+    ):
+        for fname in FILENAMES:
+            optimal, capacity, items = knapsack.read_data(FILEPATH + fname)
+            value, taken_items, best_values, elapsed = knapsack.cached_solve(
+                capacity, items, "a_star", cache
+            )
+            print(
+                f"Expected value: {optimal}, Computed value: {value}, Iterations: {best_values[-1][0]}"
+            )
+            store.add(
+                "a_star",
+                capacity,
+                items,
+                value,
+                elapsed,
+                optimal=optimal,
+                instance=fname,
+                work=best_values[-1][0],
+                best_values=best_values,
+                tag="main",
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,302 @@
+import argparse
+import json
+import sqlite3
+import subprocess
+import time
+import zlib
+
+from functools import cache
+from pathlib import Path
+from knapsack.cache import instance_hash
+
+DEFAULT_PATH = "results/results.sqlite"
+# columns of a run, besides its id, every one of them can be used to filter and group runs
+COLUMNS = [
+    "created",
+    "commit_hash",
+    "tag",
+    "instance_hash",
+    "instance",
+    "num_items",
+    "capacity",
+    "optimal",
+    "solver",
+    "params",
+    "seed",
+    "trial",
+    "value",
+    "time",
+    "work",
+    "memory",
+    "best_values",
+]
+
+
+@cache
+def current_commit() -> str | None:
+    """Hash of the checked out commit, with a `+` appended if the working tree has changes."""
+    try:
+        cwd = Path(__file__).parent
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=cwd,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=cwd,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + "+" if dirty else commit
+
+
+def canonical_params(params: dict) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+class ResultsStore:
+    """
+    Store of solver runs in an SQLite database, indexed by instance hash, solver, parameters and commit.
+    Runs are buffered by `add` and written in one transaction every `batch_size` runs, by `flush`,
+    and when the store is closed.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, batch_size: int = 500) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self._pending: list[tuple] = []
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=60)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY,
+                    created REAL NOT NULL,
+                    commit_hash TEXT,
+                    tag TEXT,
+                    instance_hash TEXT NOT NULL,
+                    instance TEXT,
+                    num_items INTEGER NOT NULL,
+                    capacity REAL NOT NULL,
+                    optimal REAL,
+                    solver TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    seed INTEGER,
+                    trial INTEGER,
+                    value REAL NOT NULL,
+                    time REAL NOT NULL,
+                    work INTEGER,
+                    memory INTEGER,
+                    best_values BLOB
+                )""")
+            for columns in [
+                "instance_hash",
+                "solver, params",
+                "commit_hash",
+                "tag",
+            ]:
+                name = "runs_" + columns.replace(", ", "_")
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON runs ({columns})"
+                )
+
+    def add(
+        self,
+        solver: str,
+        total_capacity: int | float,
+        items: list,
+        value: int | float,
+        elapsed: float,
+        params: dict | None = None,
+        optimal: int | float | None = None,
+        instance: str | None = None,
+        seed: int | None = None,
+        trial: int | None = None,
+        work: int | None = None,
+        memory: int | None = None,
+        best_values: list | None = None,
+        tag: str | None = None,
+        instance_key: str | None = None,
+    ) -> None:
+        """
+        Buffer one run.
+        # Args:
+            solver (`str`): the name of the solver. \\
+            total_capacity (`int | float`): the total capacity of the knapsack. \\
+            items (`list[Item]`): the items of the instance. \\
+            value (`int | float`): the value found. \\
+            elapsed (`float`): the wall time of the run, in seconds. \\
+            params (`dict | None`): the parameters of the solver, JSON serializable. \\
+            optimal (`int | float | None`): the optimal value of the instance, if known. \\
+            instance (`str | None`): a readable name of the instance, e.g. its file name. \\
+            seed, trial (`int | None`): the seed and the trial number of the run. \\
+            work (`int | None`): the amount of work done, e.g. iterations or generations. \\
+            memory (`int | None`): the peak memory of the run, in bytes. \\
+            best_values (`list | None`): the trace of the run, stored compressed. \\
+            tag (`str | None`): the kind of run, e.g. `"benchmark"` or `"analysis"`. \\
+            instance_key (`str | None`): the `instance_hash` of the instance, if already computed.
+        """
+        self._pending.append(
+            (
+                time.time(),
+                current_commit(),
+                tag,
+                instance_key or instance_hash(total_capacity, items),
+                instance,
+                len(items),
+                total_capacity,
+                optimal,
+                solver,
+                canonical_params(params or {}),
+                seed,
+                trial,
+                value,
+                elapsed,
+                work,
+                memory,
+                (
+                    None
+                    if best_values is None
+                    else zlib.compress(json.dumps(best_values).encode())
+                ),
+            )
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered runs in one transaction."""
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                self._pending,
+            )
+        self._pending.clear()
+
+    @staticmethod
+    def _where(filters: dict) -> tuple[str, list]:
+        conditions, arguments = [], []
+        for column, value in filters.items():
+            if column not in COLUMNS:
+                raise ValueError(f"unknown column: {column!r}")
+            if value is None:
+                continue
+            if column == "params" and isinstance(value, dict):
+                value = canonical_params(value)
+            if isinstance(value, (list, tuple)):
+                conditions.append(f"{column} IN ({', '.join('?' * len(value))})")
+                arguments.extend(value)
+            else:
+                conditions.append(f"{column} = ?")
+                arguments.append(value)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", arguments
+
+    def runs(self, limit: int | None = None, **filters) -> list[dict]:
+        """
+        The stored runs matching all `filters` (column=value, or column=list of values), newest first.
+        `params` is decoded, `best_values` is decompressed.
+        """
+        self.flush()
+        where, arguments = self._where(filters)
+        query = f"SELECT id, {', '.join(COLUMNS)} FROM runs{where} ORDER BY id DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        rows = []
+        for row in self._connection.execute(query, arguments):
+            run = dict(zip(["id"] + COLUMNS, row))
+            run["params"] = json.loads(run["params"])
+            if run["best_values"] is not None:
+                run["best_values"] = json.loads(zlib.decompress(run["best_values"]))
+            rows.append(run)
+        return rows
+
+    def summary(
+        self,
+        group_by: tuple[str, ...] = ("solver", "params", "commit_hash"),
+        **filters,
+    ) -> list[dict]:
+        """
+        Timing and quality of the runs matching `filters`, per group.
+        # Returns:
+            `list[dict]`: for every group, its columns and the number of runs, their mean, minimum and maximum time,
+            the mean ratio of the value found to the optimum and the share of runs that reached it (when the optimum is known).
+        """
+        for column in group_by:
+            if column not in COLUMNS:
+                raise ValueError(f"unknown column: {column!r}")
+        self.flush()
+        where, arguments = self._where(filters)
+        columns = ", ".join(group_by)
+        query = f"""SELECT {columns + ", " if columns else ""}
+                COUNT(*), AVG(time), MIN(time), MAX(time),
+                AVG(CASE WHEN optimal > 0 THEN value / optimal END),
+                AVG(CASE WHEN optimal IS NOT NULL THEN value >= optimal * (1 - 1e-6) END)
+            FROM runs{where}
+            {"GROUP BY " + columns if columns else ""}
+            ORDER BY {columns or 1}"""
+        names = list(group_by) + [
+            "runs",
+            "mean_time",
+            "min_time",
+            "max_time",
+            "mean_quality",
+            "optimal_rate",
+        ]
+        return [
+            dict(zip(names, row))
+            for row in self._connection.execute(query, arguments).fetchall()
+        ]
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the runs in a results store.")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument(
+        "--group-by", nargs="*", default=["solver", "params", "commit_hash"]
+    )
+    parser.add_argument("--solver", nargs="+")
+    parser.add_argument("--tag", nargs="+")
+    parser.add_argument("--commit", nargs="+", dest="commit_hash")
+    parser.add_argument("--instance", nargs="+")
+    args = parser.parse_args()
+    with ResultsStore(args.path) as store:
+        rows = store.summary(
+            tuple(args.group_by),
+            solver=args.solver,
+            tag=args.tag,
+            commit_hash=args.commit_hash,
+            instance=args.instance,
+        )
+    for row in rows:
+        print(
+            "  ".join(
+                (
+                    f"{k}={v:.4g}"
+                    if isinstance(v, float)
+                    else f"{k}={str(v)[:12] if k == 'commit_hash' else v}"
+                )
+                for k, v in row.items()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()